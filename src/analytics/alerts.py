@@ -0,0 +1,215 @@
+"""
+Indexed price-alert engine
+
+Threshold rules such as "sovereign below £550" or "XAG above £30" are kept
+per symbol in threshold-sorted arrays. On each tick only the rules whose
+threshold lies between the previous and the new price are touched, found
+by bisection, so evaluation cost does not depend on the total number of
+rules.
+
+Alerts are edge-triggered: a rule fires when the price crosses its
+threshold, is then disarmed, and re-arms only when the price crosses back.
+An optional per-rule cooldown suppresses repeat notifications when the
+price oscillates around a threshold.
+"""
+import time
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger('price_scraper')
+
+ABOVE = "above"
+BELOW = "below"
+
+
+class _SortedRules:
+    """Parallel lists of thresholds (sorted) and rule ids"""
+
+    __slots__ = ("thresholds", "rule_ids")
+
+    def __init__(self):
+        self.thresholds = []
+        self.rule_ids = []
+
+    def add(self, threshold, rule_id):
+        position = bisect.bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(position, threshold)
+        self.rule_ids.insert(position, rule_id)
+
+    def remove(self, threshold, rule_id):
+        start = bisect.bisect_left(self.thresholds, threshold)
+        end = bisect.bisect_right(self.thresholds, threshold)
+        for position in range(start, end):
+            if self.rule_ids[position] == rule_id:
+                del self.thresholds[position]
+                del self.rule_ids[position]
+                return
+
+    def ids_in(self, start, end):
+        return self.rule_ids[start:end]
+
+
+class AlertEngine:
+    """Edge-triggered threshold alerts evaluated incrementally on every tick"""
+
+    def __init__(self, on_fire=None, cooldown=0.0):
+        """
+        Args:
+            on_fire (callable, optional): Called with each fired alert event
+            cooldown (float): Minimum seconds between two firings of a rule
+        """
+        self.on_fire = on_fire
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._rules = {}        # rule_id -> rule dict
+        self._index = {}        # (symbol, direction) -> _SortedRules
+        self._last_price = {}   # symbol -> last price seen
+
+    def add_rule(self, rule_id, symbol, direction, threshold, user=None):
+        """
+        Register a threshold rule
+
+        Args:
+            rule_id: Unique rule identifier
+            symbol (str): Scraper key, e.g. "sovereign" or "XAG"
+            direction (str): "above" or "below"
+            threshold (float): Price that triggers the alert
+            user (str, optional): Owner of the rule, passed through to events
+
+        Returns:
+            dict: The alert event if the condition already holds at the last
+                  known price (it fires straight away), otherwise None
+        """
+        if direction not in (ABOVE, BELOW):
+            raise ValueError(f"Unknown alert direction: {direction}")
+
+        with self._lock:
+            if rule_id in self._rules:
+                self._remove(rule_id)
+            rule = {"rule_id": rule_id, "symbol": symbol, "direction": direction,
+                    "threshold": threshold, "user": user, "armed": True, "last_fired": None}
+            self._rules[rule_id] = rule
+            self._index.setdefault((symbol, direction), _SortedRules()).add(threshold, rule_id)
+
+            price = self._last_price.get(symbol)
+            event = None
+            if price is not None and _satisfied(rule, price):
+                event = self._fire(rule, price, None)
+
+        if event is not None:
+            self._notify([event])
+        return event
+
+    def remove_rule(self, rule_id):
+        with self._lock:
+            self._remove(rule_id)
+
+    def tick(self, symbol, price):
+        """
+        Evaluate a new price for a symbol
+
+        Returns:
+            list: Alert events fired by this tick
+        """
+        if price is None:
+            return []
+
+        with self._lock:
+            previous = self._last_price.get(symbol)
+            self._last_price[symbol] = price
+            if previous == price:
+                return []
+
+            above = self._index.get((symbol, ABOVE))
+            below = self._index.get((symbol, BELOW))
+            fire_ids = []
+            rearm_ids = []
+
+            if previous is None:
+                # First price: every rule whose condition already holds fires once
+                if above:
+                    fire_ids += above.ids_in(0, bisect.bisect_left(above.thresholds, price))
+                if below:
+                    fire_ids += below.ids_in(bisect.bisect_right(below.thresholds, price), len(below.thresholds))
+            elif price > previous:
+                # Crossed up through "above" thresholds in [previous, price)
+                if above:
+                    fire_ids += above.ids_in(bisect.bisect_left(above.thresholds, previous),
+                                             bisect.bisect_left(above.thresholds, price))
+                # "below" thresholds in (previous, price] are no longer satisfied
+                if below:
+                    rearm_ids += below.ids_in(bisect.bisect_right(below.thresholds, previous),
+                                              bisect.bisect_right(below.thresholds, price))
+            else:
+                # Crossed down through "below" thresholds in (price, previous]
+                if below:
+                    fire_ids += below.ids_in(bisect.bisect_right(below.thresholds, price),
+                                             bisect.bisect_right(below.thresholds, previous))
+                # "above" thresholds in [price, previous) are no longer satisfied
+                if above:
+                    rearm_ids += above.ids_in(bisect.bisect_left(above.thresholds, price),
+                                              bisect.bisect_left(above.thresholds, previous))
+
+            for rule_id in rearm_ids:
+                self._rules[rule_id]["armed"] = True
+
+            events = []
+            for rule_id in fire_ids:
+                event = self._fire(self._rules[rule_id], price, previous)
+                if event is not None:
+                    events.append(event)
+
+        self._notify(events)
+        return events
+
+    def update_from_snapshot(self, snapshot):
+        """Tick every priced symbol of an aggregator snapshot"""
+        events = []
+        for items in snapshot.values():
+            for symbol, item in items.items():
+                events += self.tick(symbol, item.get("price"))
+        return events
+
+    def rule_count(self):
+        return len(self._rules)
+
+    def _fire(self, rule, price, previous):
+        """Disarm a rule and build its event, unless it is disarmed or cooling down"""
+        if not rule["armed"]:
+            return None
+        now = time.time()
+        rule["armed"] = False
+        if rule["last_fired"] is not None and now - rule["last_fired"] < self.cooldown:
+            return None
+        rule["last_fired"] = now
+        return {
+            "rule_id": rule["rule_id"],
+            "user": rule["user"],
+            "symbol": rule["symbol"],
+            "direction": rule["direction"],
+            "threshold": rule["threshold"],
+            "price": price,
+            "previous_price": previous,
+            "ts": now,
+        }
+
+    def _remove(self, rule_id):
+        rule = self._rules.pop(rule_id, None)
+        if rule is not None:
+            self._index[(rule["symbol"], rule["direction"])].remove(rule["threshold"], rule_id)
+
+    def _notify(self, events):
+        if self.on_fire is None:
+            return
+        for event in events:
+            try:
+                self.on_fire(event)
+            except Exception as e:
+                logger.error(f"Alert callback failed for rule {event['rule_id']}: {e}")
+
+
+def _satisfied(rule, price):
+    if rule["direction"] == ABOVE:
+        return price > rule["threshold"]
+    return price < rule["threshold"]
@@ -0,0 +1,122 @@
+"""
+Incrementally maintained best-price index across dealers
+
+Keeps the cheapest buy price and the best sell (buyback) price for every
+canonical product and every (metal, weight) class. Each price update costs
+O(log n) heap work; "where is it cheapest right now" is a dictionary lookup.
+Stale and failed snapshot items withdraw a dealer's quote, and every quote
+carries the time it was fetched.
+"""
+import time
+import heapq
+import itertools
+import threading
+from scrapers.products import CANONICAL_PRODUCTS, canonical_product
+
+BUY = "buy"
+SELL = "sell"
+SIDES = (BUY, SELL)
+
+
+class BestPriceIndex:
+    """Cheapest buy / best sell price per canonical product and weight class"""
+
+    def __init__(self, products=None):
+        self.products = CANONICAL_PRODUCTS if products is None else products
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        # (dealer, product_id, side) -> (price, seq) currently quoted
+        self._quotes = {}
+        # (group, side) -> heap of (sort key, seq, price, dealer, product_id, fetched_at)
+        self._heaps = {}
+        # (group, side) -> {"price", "dealer", "product", "fetched_at"} or absent
+        self._best = {}
+
+    def update(self, dealer, product_id, price, side=BUY, fetched_at=None):
+        """
+        Record a dealer's current price for a canonical product
+
+        Args:
+            dealer (str): Dealer name, e.g. "chards"
+            product_id (str): Canonical product id from CANONICAL_PRODUCTS
+            price (float): Current price, or None to withdraw the quote
+            side (str): "buy" (what we pay the dealer) or "sell" (their buyback)
+            fetched_at (float, optional): When the price was scraped. Defaults to now.
+        """
+        if side not in SIDES:
+            raise ValueError(f"Unknown side: {side}")
+        if product_id not in self.products:
+            raise KeyError(f"Unknown canonical product: {product_id}")
+
+        with self._lock:
+            if price is None:
+                self._quotes.pop((dealer, product_id, side), None)
+            else:
+                seq = next(self._seq)
+                self._quotes[(dealer, product_id, side)] = (price, seq)
+                # Buy side wants the lowest price, sell side the highest
+                sort_key = price if side == BUY else -price
+                fetched_at = time.time() if fetched_at is None else fetched_at
+                entry = (sort_key, seq, price, dealer, product_id, fetched_at)
+                for group in self._groups(product_id):
+                    heap = self._heaps.setdefault((group, side), [])
+                    heapq.heappush(heap, entry)
+                    if len(heap) > 16 + 4 * len(self._quotes):
+                        self._compact(heap, side)
+
+            for group in self._groups(product_id):
+                self._refresh_best(group, side)
+
+    def update_from_snapshot(self, snapshot, side=BUY):
+        """
+        Apply an aggregator snapshot ({dealer: {key: {"price", ...}}})
+
+        Dealer keys without a canonical product (e.g. spot prices) are skipped.
+        Stale items (a cached price, possibly hours old) and failed items
+        withdraw the dealer's quote, so best() only names dealers whose
+        current price is known.
+        """
+        for dealer, items in snapshot.items():
+            for dealer_key, item in items.items():
+                product_id = canonical_product(dealer, dealer_key)
+                if product_id is None:
+                    continue
+                price = item.get("price") if item.get("status", "fresh") == "fresh" else None
+                self.update(dealer, product_id, price, side, item.get("fetched_at"))
+
+    def best(self, product_id, side=BUY):
+        """
+        Best current quote for a canonical product
+
+        Returns:
+            dict: {"price", "dealer", "product", "fetched_at"} or None if nobody quotes it
+        """
+        return self._best.get((("product", product_id), side))
+
+    def best_in_class(self, metal, weight, side=BUY):
+        """Best current quote across all products of a (metal, weight in oz) class"""
+        return self._best.get((("class", (metal, weight)), side))
+
+    def _groups(self, product_id):
+        _, metal, weight, _ = self.products[product_id]
+        return (("product", product_id), ("class", (metal, weight)))
+
+    def _compact(self, heap, side):
+        """Rebuild a heap without superseded entries so it cannot grow unbounded"""
+        heap[:] = [
+            entry for entry in heap
+            if self._quotes.get((entry[3], entry[4], side)) == (entry[2], entry[1])
+        ]
+        heapq.heapify(heap)
+
+    def _refresh_best(self, group, side):
+        """Drop superseded heap entries until the top is a live quote"""
+        heap = self._heaps.get((group, side), [])
+        while heap:
+            _, seq, price, dealer, product_id, fetched_at = heap[0]
+            if self._quotes.get((dealer, product_id, side)) == (price, seq):
+                self._best[(group, side)] = {"price": price, "dealer": dealer, "product": product_id,
+                                             "fetched_at": fetched_at}
+                return
+            heapq.heappop(heap)
+        self._best.pop((group, side), None)
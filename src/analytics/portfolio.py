@@ -0,0 +1,225 @@
+"""
+Vectorised portfolio valuation with incremental revaluation on tick
+
+Holdings for any number of client portfolios are stored as flat numpy arrays
+(portfolio index, symbol index, quantity, cost). Market value, cost basis
+and P&L per portfolio are computed with bincount rather than a Python loop,
+and when a single symbol ticks only the portfolios holding it are touched.
+
+Symbols are the scraper keys, e.g. "sovereign" from CHARD_COINS (quantity
+in coins) or "XAU" from ATKINSONS_SPOT (quantity in troy ounces).
+"""
+import threading
+import numpy as np
+
+
+class PortfolioBook:
+    """Holdings and running valuations for many client portfolios"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.portfolio_ids = []
+        self.symbols = []
+        self._portfolio_index = {}
+        self._symbol_index = {}
+
+        # Holdings buffered since the last rebuild
+        self._pending = []
+
+        # Flat holding arrays
+        self._holding_portfolio = np.empty(0, dtype=np.int64)
+        self._holding_symbol = np.empty(0, dtype=np.int64)
+        self._quantity = np.empty(0, dtype=np.float64)
+        self._cost = np.empty(0, dtype=np.float64)
+
+        # Latest price per symbol (NaN until first tick)
+        self._prices = np.empty(0, dtype=np.float64)
+
+        # Per-symbol exposure: symbol -> (portfolio indices, total quantity held, holding count)
+        self._exposure = {}
+
+        # Per-portfolio aggregates
+        self._market_value = np.empty(0, dtype=np.float64)
+        self._cost_basis = np.empty(0, dtype=np.float64)
+        self._unpriced = np.empty(0, dtype=np.int64)
+
+    def add_holding(self, portfolio_id, symbol, quantity, cost):
+        """
+        Add a position to a portfolio
+
+        Args:
+            portfolio_id (str): Client portfolio identifier
+            symbol (str): Scraper key, e.g. "sovereign" or "XAU"
+            quantity (float): Coins, or troy ounces for spot symbols
+            cost (float): Total amount paid for the position, in GBP
+        """
+        with self._lock:
+            self._pending.append((portfolio_id, symbol, quantity, cost))
+
+    def load_holdings(self, portfolio_ids, symbols, quantities, costs):
+        """Bulk add positions from equal-length sequences"""
+        with self._lock:
+            self._pending.extend(zip(portfolio_ids, symbols, quantities, costs))
+
+    def update_prices(self, prices):
+        """
+        Apply new prices and revalue only the portfolios holding those symbols
+
+        Args:
+            prices (dict): {symbol: price}
+        """
+        with self._lock:
+            self._rebuild_if_needed()
+            for symbol, price in prices.items():
+                self._tick(symbol, price)
+
+    def on_tick(self, symbol, price):
+        """Apply one new price"""
+        self.update_prices({symbol: price})
+
+    def update_from_snapshot(self, snapshot):
+        """Apply an aggregator snapshot ({dealer: {symbol: {"price", ...}}})"""
+        self.update_prices({
+            symbol: item["price"]
+            for items in snapshot.values()
+            for symbol, item in items.items()
+            if item.get("price")
+        })
+
+    def valuation(self, portfolio_id):
+        """
+        Current valuation of one portfolio
+
+        Returns:
+            dict: market_value, cost_basis, pnl, pnl_pct and unpriced (positions
+                  whose symbol has no price yet), or None for an unknown portfolio
+        """
+        with self._lock:
+            self._rebuild_if_needed()
+            index = self._portfolio_index.get(portfolio_id)
+            if index is None:
+                return None
+            market_value = float(self._market_value[index])
+            cost_basis = float(self._cost_basis[index])
+            return {
+                "market_value": market_value,
+                "cost_basis": cost_basis,
+                "pnl": market_value - cost_basis,
+                "pnl_pct": (market_value - cost_basis) / cost_basis if cost_basis else None,
+                "unpriced": int(self._unpriced[index]),
+            }
+
+    def valuations(self):
+        """
+        Valuations of every portfolio as arrays aligned with portfolio_ids
+
+        Returns:
+            dict: {"portfolio_ids", "market_value", "cost_basis", "pnl"}
+        """
+        with self._lock:
+            self._rebuild_if_needed()
+            return {
+                "portfolio_ids": list(self.portfolio_ids),
+                "market_value": self._market_value.copy(),
+                "cost_basis": self._cost_basis.copy(),
+                "pnl": self._market_value - self._cost_basis,
+            }
+
+    def revalue_all(self):
+        """Recompute every aggregate from scratch (vectorised)"""
+        with self._lock:
+            self._rebuild_if_needed()
+            self._full_revalue()
+
+    def _tick(self, symbol, price):
+        if price is None:
+            return
+
+        index = self._symbol_index.get(symbol)
+        if index is None:
+            # Nobody holds it yet; keep the price for holdings added later
+            self._intern(self._symbol_index, self.symbols, symbol)
+            self._prices = np.append(self._prices, price)
+            return
+
+        old_price = self._prices[index]
+        if old_price == price:
+            return
+        if index not in self._exposure:
+            # Ticked before, but still not held by anyone
+            self._prices[index] = price
+            return
+
+        portfolios, held, counts = self._exposure[index]
+        if np.isnan(old_price):
+            self._market_value[portfolios] += held * price
+            self._unpriced[portfolios] -= counts
+        else:
+            self._market_value[portfolios] += held * (price - old_price)
+        self._prices[index] = price
+
+    def _rebuild_if_needed(self):
+        if self._pending:
+            self._rebuild()
+
+    def _rebuild(self):
+        """Fold buffered holdings into the arrays and recompute aggregates"""
+        new_portfolio = np.fromiter(
+            (self._intern(self._portfolio_index, self.portfolio_ids, p) for p, _, _, _ in self._pending),
+            dtype=np.int64, count=len(self._pending))
+        new_symbol = np.fromiter(
+            (self._intern(self._symbol_index, self.symbols, s) for _, s, _, _ in self._pending),
+            dtype=np.int64, count=len(self._pending))
+        new_quantity = np.fromiter((q for _, _, q, _ in self._pending), dtype=np.float64, count=len(self._pending))
+        new_cost = np.fromiter((c for _, _, _, c in self._pending), dtype=np.float64, count=len(self._pending))
+        self._pending = []
+
+        self._holding_portfolio = np.concatenate([self._holding_portfolio, new_portfolio])
+        self._holding_symbol = np.concatenate([self._holding_symbol, new_symbol])
+        self._quantity = np.concatenate([self._quantity, new_quantity])
+        self._cost = np.concatenate([self._cost, new_cost])
+
+        if len(self._prices) < len(self.symbols):
+            self._prices = np.concatenate([self._prices, np.full(len(self.symbols) - len(self._prices), np.nan)])
+
+        self._build_exposure()
+        self._full_revalue()
+
+    def _build_exposure(self):
+        """Total quantity per (symbol, portfolio), grouped by symbol"""
+        n_portfolios = len(self.portfolio_ids)
+        if n_portfolios == 0:
+            self._exposure = {}
+            return
+
+        keys = self._holding_symbol * n_portfolios + self._holding_portfolio
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        held = np.bincount(inverse, weights=self._quantity)
+        counts = np.bincount(inverse).astype(np.int64)
+        symbol_of_key = unique_keys // n_portfolios
+        portfolio_of_key = unique_keys % n_portfolios
+
+        # unique_keys is sorted, so each symbol's portfolios form one slice
+        boundaries = np.searchsorted(symbol_of_key, np.arange(len(self.symbols) + 1))
+        self._exposure = {}
+        for index in range(len(self.symbols)):
+            group = slice(boundaries[index], boundaries[index + 1])
+            self._exposure[index] = (portfolio_of_key[group], held[group], counts[group])
+
+    def _full_revalue(self):
+        n_portfolios = len(self.portfolio_ids)
+        prices = self._prices[self._holding_symbol]
+        priced = ~np.isnan(prices)
+        self._market_value = np.bincount(self._holding_portfolio, weights=np.where(priced, self._quantity * prices, 0.0),
+                                         minlength=n_portfolios)
+        self._cost_basis = np.bincount(self._holding_portfolio, weights=self._cost, minlength=n_portfolios)
+        self._unpriced = np.bincount(self._holding_portfolio[~priced], minlength=n_portfolios).astype(np.int64)
+
+    @staticmethod
+    def _intern(index, names, name):
+        position = index.get(name)
+        if position is None:
+            position = len(names)
+            index[name] = position
+            names.append(name)
+        return position
@@ -1,12 +1,86 @@
 # In src/main.py
-from scrapers.chards_prod import get_all_prices
-from scrapers.chards_prod import update_price as chard_update_price
-from scrapers.coins import CHARD_COINS
+import os
+import time
+import argparse
+from scrapers import aggregator
+from scrapers.aggregator import get_aggregated_prices
+from scrapers.log_setup import configure_logging
+from scrapers.scheduler import AdaptiveScheduler
+from scrapers.snapshot_log import SnapshotLog
+from utils.database import store_snapshot
+from utils.profiling import CycleProfiler
+
+
+def run_cycle(snapshot_log, symbols=None):
+    """
+    Fetch one snapshot across every dealer, print it and store it
+
+    Args:
+        symbols (dict, optional): {dealer: [symbols]} due this cycle; defaults to everything
+    """
+    # One bounded-latency snapshot across every dealer
+    dealers = list(symbols) if symbols is not None else None
+    snapshot = get_aggregated_prices(dealers=dealers, symbols=symbols)
+    for dealer, items in snapshot.items():
+        for symbol, item in items.items():
+            print(f"{dealer} {symbol}: {item['price']} ({item['status']})")
+
+    # Keep every snapshot in the append-only log
+    snapshot_log.append({"dealers": snapshot})
+
+    # Store fresh prices in MongoDB (history plus the latest-price view)
+    if os.getenv('MONGODB_URI'):
+        store_snapshot(snapshot)
+
+    return snapshot
+
 
 if __name__ == "__main__":
-    # get_all_prices("logging")
-    # print (get_all_prices())
-    sovereign_price, coin_name = chard_update_price("sovereign")
-    print(sovereign_price)
+    parser = argparse.ArgumentParser(description="Finance Tool price scraper")
+    parser.add_argument("--cycles", type=int, default=1, help="Scrape cycles to run (0 runs forever)")
+    parser.add_argument("--interval", type=float, default=float(os.getenv('SCRAPE_INTERVAL', '3600')),
+                        help="Seconds between cycles")
+    parser.add_argument("--adaptive", action="store_true",
+                        default=os.getenv('SCRAPE_ADAPTIVE', 'false').lower() == 'true',
+                        help="Poll each symbol at an interval adapted to its volatility")
+    parser.add_argument("--profile", action="store_true", help="Profile scrape cycles")
+    parser.add_argument("--profile-every", type=int, default=int(os.getenv('PROFILE_EVERY', '0')),
+                        help="Profile one cycle in N of this run (implies --profile; "
+                             "only thins profiling with --cycles 0 or > N)")
+    parser.add_argument("--profile-dir", default=os.getenv('PROFILE_DIR', 'profiles'))
+    args = parser.parse_args()
+
+    # Scraper logs go through a background writer, off the worker threads
+    configure_logging()
+
+    profiler = None
+    if args.profile or args.profile_every:
+        profiler = CycleProfiler(args.profile_dir, every=args.profile_every or 1)
+        aggregator.TASK_WRAPPER = profiler.task_wrapper
+
+    scheduler = None
+    if args.adaptive:
+        scheduler = AdaptiveScheduler({dealer: symbols for dealer, (_, symbols) in aggregator.DEALERS.items()},
+                                      base_interval=args.interval)
+
+    snapshot_log = SnapshotLog(os.getenv('SNAPSHOT_LOG_DIR', 'snapshots'))
+    cycle = 0
+    try:
+        while args.cycles == 0 or cycle < args.cycles:
+            due = None
+            if scheduler is not None:
+                # Sleep until the next symbol is due, then poll only what is due
+                time.sleep(scheduler.seconds_until_next())
+                due = scheduler.due()
+            elif cycle:
+                time.sleep(args.interval)
 
-    
\ No newline at end of file
+            if profiler is not None:
+                snapshot = profiler.run(run_cycle, snapshot_log, due)
+            else:
+                snapshot = run_cycle(snapshot_log, due)
+            if scheduler is not None:
+                scheduler.observe_snapshot(snapshot)
+            cycle += 1
+    finally:
+        snapshot_log.close()
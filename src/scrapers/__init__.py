@@ -0,0 +1,4 @@
+# Load .env before any scraper module reads its settings from the environment
+from dotenv import load_dotenv
+
+load_dotenv()
@@ -0,0 +1,161 @@
+"""
+Cross-dealer price aggregator
+
+Runs every registered dealer's update_price concurrently under a single cycle
+deadline and returns whatever completed in time. Each item carries a status:
+    fresh  - scraped during this cycle
+    stale  - not ready in time (or failed), last good price served from cache
+    failed - no price this cycle and nothing cached
+Fresh prices pass through the anomaly validator first; a quarantined price
+is treated like a failed fetch and its reason is reported in "anomaly".
+Fetches still running at the deadline carry on in the background and refresh
+the cache for the next cycle.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from . import chards_prod, atkinson_spot_prod
+from .coins import CHARD_COINS
+from .metals_spot import ATKINSONS_SPOT
+from .anomaly import validator_from_env
+
+logger = logging.getLogger('price_scraper')
+
+CYCLE_DEADLINE = float(os.getenv('CYCLE_DEADLINE', '12'))  # In seconds
+MAX_WORKERS = int(os.getenv('SCRAPE_WORKERS', '8'))
+
+# DEALERS: dealer name -> [update_price function, symbols it prices]
+# (uncached: a cycle's "fresh" prices must really be scraped in that cycle)
+DEALERS = {
+    "chards": [chards_prod.update_price.uncached, list(CHARD_COINS)],
+    "atkinsons": [atkinson_spot_prod.update_price.uncached, list(ATKINSONS_SPOT)],
+}
+
+# Checks every scraped price before it is reported or cached
+VALIDATOR = validator_from_env()
+
+# Optional wrapper(function, *args) around every worker task, e.g. a profiler
+TASK_WRAPPER = None
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="scrape")
+_lock = threading.Lock()
+_last_good = {}   # (dealer, symbol) -> {"price", "name", "fetched_at"}
+_in_flight = {}   # (dealer, symbol) -> Future still running from an earlier cycle
+
+
+def register_dealer(dealer, update_price, symbols):
+    """
+    Add a dealer to the aggregator
+
+    Args:
+        dealer (str): Dealer name, e.g. "chards"
+        update_price (callable): update_price(symbol) -> (price, name)
+        symbols (list): Symbols to fetch each cycle
+    """
+    DEALERS[dealer] = [update_price, list(symbols)]
+
+
+def get_aggregated_prices(deadline=None, dealers=None, symbols=None):
+    """
+    Fetch all dealers concurrently and return a bounded-latency snapshot
+
+    Args:
+        deadline (float, optional): Seconds to wait for this cycle.
+                                    Defaults to CYCLE_DEADLINE.
+        dealers (list, optional): Only fetch these dealers
+        symbols (dict, optional): {dealer: [symbols]} to fetch instead of
+                                  each dealer's full list
+
+    Returns:
+        dict: {dealer: {symbol: {"price", "name", "status", "fetched_at", "error", "anomaly"}}}
+    """
+    deadline = CYCLE_DEADLINE if deadline is None else deadline
+    cycle_start = time.time()
+
+    futures = {}
+    for dealer, (update_price, dealer_symbols) in DEALERS.items():
+        if dealers is not None and dealer not in dealers:
+            continue
+        if symbols is not None:
+            dealer_symbols = symbols.get(dealer, [])
+        for symbol in dealer_symbols:
+            futures[(dealer, symbol)] = _submit(dealer, symbol, update_price)
+
+    done, not_done = wait(list(futures.values()), timeout=deadline)
+
+    results = {}
+    for (dealer, symbol), future in futures.items():
+        item = {"price": None, "name": None, "status": "failed", "fetched_at": None, "error": None, "anomaly": None}
+
+        if future in done:
+            try:
+                price, name, anomaly = future.result()
+                item.update(name=name, anomaly=anomaly)
+                if price:
+                    item.update(price=price, status="fresh", fetched_at=time.time())
+                elif anomaly:
+                    item["error"] = "price quarantined as anomalous"
+                else:
+                    item["error"] = "no price found"
+            except Exception as e:
+                item["error"] = str(e)
+        else:
+            item["error"] = f"not completed within {deadline}s deadline"
+
+        if item["status"] != "fresh":
+            with _lock:
+                cached = _last_good.get((dealer, symbol))
+            if cached:
+                item.update(cached, status="stale")
+
+        results.setdefault(dealer, {})[symbol] = item
+
+    fresh = sum(1 for per_dealer in results.values() for item in per_dealer.values() if item["status"] == "fresh")
+    logger.info("Aggregated cycle: %d/%d fresh in %.2fs (%d still running)",
+                fresh, len(futures), time.time() - cycle_start, len(not_done))
+    return results
+
+
+def _submit(dealer, symbol, update_price):
+    """Start a fetch, reusing one still in flight from an earlier cycle"""
+    key = (dealer, symbol)
+    with _lock:
+        future = _in_flight.get(key)
+        if future is not None and not future.done():
+            return future
+        if TASK_WRAPPER is not None:
+            future = _executor.submit(TASK_WRAPPER, _fetch_and_validate, dealer, symbol, update_price)
+        else:
+            future = _executor.submit(_fetch_and_validate, dealer, symbol, update_price)
+        _in_flight[key] = future
+    future.add_done_callback(lambda f: _on_done(key, f))
+    return future
+
+
+def _fetch_and_validate(dealer, symbol, update_price):
+    """
+    Fetch one price and run it through the validator
+
+    Returns:
+        tuple: (price, name, anomaly reason). price is None when the fetch
+               failed or the price was quarantined.
+    """
+    price, name = update_price(symbol)
+    if not price:
+        return None, name, None
+    accepted, anomaly = VALIDATOR.check(dealer, symbol, price)
+    return (price if accepted else None), name, anomaly
+
+
+def _on_done(key, future):
+    """Keep the last good price for stale fallbacks, even after the deadline"""
+    try:
+        price, name, _ = future.result()
+    except Exception as e:
+        logger.error(f"Error fetching {key[0]} {key[1]}: {e}")
+        return
+    if price:
+        with _lock:
+            _last_good[key] = {"price": price, "name": name, "fetched_at": time.time()}
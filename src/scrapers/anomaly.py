@@ -0,0 +1,185 @@
+"""
+Streaming validation of scraped prices
+
+Keeps an exponentially weighted mean and variance per (source, symbol),
+updated in constant time, and checks each new observation against
+configurable bands before it is accepted:
+    - percentage jump versus the last accepted price
+    - z-score versus the rolling mean and standard deviation
+    - optional absolute min / max per symbol
+
+In "quarantine" mode rejected prices are held back (and kept for review);
+in "flag" mode they pass through with the reason attached. A genuine level
+shift is accepted once several consecutive jump / z-score rejects agree
+with each other; prices outside the absolute bounds never count towards one.
+"""
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger('price_scraper')
+
+ANOMALY_MODES = ("quarantine", "flag", "off")
+
+
+class _SymbolState:
+    """Rolling stats for one (source, symbol)"""
+
+    __slots__ = ("count", "mean", "variance", "last_price", "pending")
+
+    def __init__(self, window):
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.last_price = None
+        # The latest consecutive rejected prices, used to detect a genuine level shift
+        self.pending = deque(maxlen=window)
+
+
+class PriceValidator:
+    """Constant-time anomaly checks for a stream of prices"""
+
+    def __init__(self, mode="quarantine", max_zscore=6.0, max_jump=0.10, alpha=0.1,
+                 min_observations=5, shift_confirmations=3, bounds=None, quarantine_size=1000):
+        """
+        Args:
+            mode (str): "quarantine", "flag" or "off"
+            max_zscore (float): Reject prices this many standard deviations from the mean
+            max_jump (float): Reject prices moving more than this fraction from the last price
+            alpha (float): EWMA weight of each new price (higher reacts faster)
+            min_observations (int): Prices needed before the z-score band applies
+            shift_confirmations (int): Consecutive agreeing rejects that are accepted as a level shift
+            bounds (dict, optional): {symbol: (min, max)} absolute limits
+            quarantine_size (int): Rejected observations kept for review
+        """
+        if mode not in ANOMALY_MODES:
+            raise ValueError(f"Unknown anomaly mode: {mode} (expected one of {', '.join(ANOMALY_MODES)})")
+        self.mode = mode
+        self.max_zscore = max_zscore
+        self.max_jump = max_jump
+        self.alpha = alpha
+        self.min_observations = min_observations
+        self.shift_confirmations = shift_confirmations
+        self.bounds = bounds or {}
+        self.quarantine = deque(maxlen=quarantine_size)
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def check(self, source, symbol, price):
+        """
+        Validate one observation and update the rolling stats
+
+        Returns:
+            tuple: (accepted, reason). accepted is False only in quarantine
+                   mode; reason is None for plausible prices.
+        """
+        if self.mode == "off":
+            return True, None
+
+        with self._lock:
+            state = self._states.get((source, symbol))
+            if state is None:
+                # A shift needs the current price plus shift_confirmations - 1 earlier rejects
+                state = self._states[(source, symbol)] = _SymbolState(max(0, self.shift_confirmations - 1))
+            reason = self._out_of_bounds(symbol, price)
+            if reason is not None:
+                # Never plausible, so it neither moves the stats nor counts towards a level shift
+                self._reject(source, symbol, price, reason)
+                return self.mode == "flag", reason
+
+            reason = self._find_anomaly(state, price)
+            if reason is None:
+                state.pending.clear()
+                self._update(state, price)
+                return True, None
+
+            if self._is_level_shift(state, price):
+                logger.warning(f"Accepting {source} {symbol} level shift to £{price} after {self.shift_confirmations} consistent prices")
+                self._reset(state, list(state.pending) + [price])
+                return True, None
+
+            state.pending.append(price)
+            self._reject(source, symbol, price, reason)
+
+            if self.mode == "flag":
+                self._update(state, price)
+                return True, reason
+            return False, reason
+
+    def stats(self, source, symbol):
+        """Current rolling mean, standard deviation and count for a symbol"""
+        with self._lock:
+            state = self._states.get((source, symbol))
+            if state is None:
+                return None
+            return {"count": state.count, "mean": state.mean,
+                    "std": math.sqrt(state.variance), "last_price": state.last_price}
+
+    def _out_of_bounds(self, symbol, price):
+        """Reason the price can never be right (not a positive number, outside bounds), or None"""
+        if price is None or not math.isfinite(price) or price <= 0:
+            return "not a positive number"
+
+        low, high = self.bounds.get(symbol, (None, None))
+        if low is not None and price < low:
+            return f"below minimum {low}"
+        if high is not None and price > high:
+            return f"above maximum {high}"
+        return None
+
+    def _find_anomaly(self, state, price):
+        """Reason the price is implausible next to recent prices (jump, z-score), or None"""
+        if state.last_price:
+            jump = abs(price - state.last_price) / state.last_price
+            if jump > self.max_jump:
+                return f"{jump:.1%} jump from £{state.last_price}"
+
+        if state.count >= self.min_observations and state.variance > 0:
+            zscore = abs(price - state.mean) / math.sqrt(state.variance)
+            if zscore > self.max_zscore:
+                return f"z-score {zscore:.1f} from mean £{state.mean:.2f}"
+
+        return None
+
+    def _reject(self, source, symbol, price, reason):
+        self.quarantine.append({"source": source, "symbol": symbol, "price": price,
+                                "reason": reason, "ts": time.time()})
+        logger.warning(f"Anomalous {source} {symbol} price £{price}: {reason}")
+
+    def _is_level_shift(self, state, price):
+        """True when this price completes a run of rejects that agree with each other"""
+        if len(state.pending) + 1 < self.shift_confirmations:
+            return False
+        centre = (sum(state.pending) + price) / (len(state.pending) + 1)
+        return all(abs(p - centre) / centre <= self.max_jump for p in (*state.pending, price))
+
+    def _update(self, state, price):
+        """EWMA mean / variance update (West's incremental form)"""
+        if state.count == 0:
+            state.mean = price
+            state.variance = 0.0
+        else:
+            delta = price - state.mean
+            increment = self.alpha * delta
+            state.mean += increment
+            state.variance = (1 - self.alpha) * (state.variance + delta * increment)
+        state.count += 1
+        state.last_price = price
+
+    def _reset(self, state, prices):
+        state.count = 0
+        state.pending.clear()
+        for p in prices:
+            self._update(state, p)
+
+
+def validator_from_env():
+    """Build a PriceValidator from ANOMALY_MODE, ANOMALY_MAX_ZSCORE and ANOMALY_MAX_JUMP"""
+    return PriceValidator(
+        mode=os.getenv('ANOMALY_MODE', 'quarantine'),
+        max_zscore=float(os.getenv('ANOMALY_MAX_ZSCORE', '6')),
+        max_jump=float(os.getenv('ANOMALY_MAX_JUMP', '0.10')),
+    )
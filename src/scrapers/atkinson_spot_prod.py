@@ -1,11 +1,14 @@
 """
 Atkinsons website scraper for precious metals spot prices
 """
-import requests
 from bs4 import BeautifulSoup
 import re
 import logging
-from metals_spot import ATKINSONS_SPOT  # Import from config
+from .metals_spot import ATKINSONS_SPOT  # Import from config
+from .fetch import fetch_page
+from .log_setup import configure_logging
+from .result_cache import cached
+from .strategy import AdaptiveStrategies
 
 logger = logging.getLogger('price_scraper')
 
@@ -20,31 +23,42 @@ def get_all_prices(output_type=None):
     
     Returns:
         dict: Dictionary of coin prices
+    
+    Results come from the result cache when recent enough (see
+    result_cache.py); set_result_cache_enabled(False) forces fresh scrapes.
     """
-    # Set up logging if requested
+    # Set up logging if requested (queue-backed, so it stays off the hot path)
     if output_type == "logging":
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        configure_logging()
+    
+    results = _all_prices()
     
+    # Print results if logging mode is active
+    if output_type == "logging":
+        for metal_symbol, entry in ATKINSONS_SPOT.items():
+            if metal_symbol in results:
+                print(f"The current {results[metal_symbol]['name']} price is: £{results[metal_symbol]['price']}")
+            else:
+                print(f"Could not find the price for {entry[1]}")
+    
+    # Copies, so callers cannot alter the cached results
+    return {key: dict(value) for key, value in results.items()}
+
+@cached(cache_if=lambda results: len(results) == len(ATKINSONS_SPOT))
+def _all_prices():
+    """Prices of every metal that could be scraped, cached only when complete"""
     results = {}
     for metal_symbol in ATKINSONS_SPOT:
-        price, metal_name = update_price(metal_symbol)
+        # Uncached: a stale update_price entry would be re-stored here as fresh
+        price, metal_name = update_price.uncached(metal_symbol)
         if price:
             results[metal_symbol] = {
                 "price": price,
                 "name": metal_name
             }
-            
-            # Print results if logging mode is active
-            if output_type == "logging":
-                print(f"The current {metal_name} price is: £{price}")
-        elif output_type == "logging":
-            print(f"Could not find the price for {metal_name}")
-    
     return results
 
+@cached(cache_if=lambda result: result[0] is not None)
 def update_price(metal_symbol):
     """Fetch the price for a specific coin"""
     if metal_symbol not in ATKINSONS_SPOT:
@@ -55,28 +69,21 @@ def update_price(metal_symbol):
     metal_name = ATKINSONS_SPOT[metal_symbol][1]
     class_name = ATKINSONS_SPOT[metal_symbol][2]
     
-    price = scrape_atkinsons_spot_price(url, metal_name, class_name)
+    price = scrape_atkinsons_spot_price(url, metal_name, class_name, metal_symbol)
     
     if price:
-        logger.info(f"Successfully scraped {metal_name} price: £{price}")
+        logger.info("Successfully scraped %s price: £%s", metal_name, price,
+                    extra={"source": "atkinsons", "event": "price_scraped"})
         return price, metal_name
     else:
         logger.error(f"Failed to scrape {metal_name} price")
         return None, metal_name
 
-def scrape_atkinsons_spot_price(url, metal_name, class_name):
+def scrape_atkinsons_spot_price(url, metal_name, class_name, metal_symbol=None):
     """Scrape the price from the Atkinsons homepage"""
     try:
-        # Set up headers to mimic a browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Referer': 'https://www.atkinsonsbullion.com/'
-        }
-        
-        # Make the request with a timeout
-        response = requests.get(url, headers=headers, timeout=10)
+        # Fetch through the shared layer (live, record or replay)
+        response = fetch_page(url, referer='https://www.atkinsonsbullion.com/', source='atkinsons')
         
         # Check if request was successful
         if response.status_code != 200:
@@ -87,7 +94,7 @@ def scrape_atkinsons_spot_price(url, metal_name, class_name):
         soup = BeautifulSoup(response.text, 'html.parser')
         
         # Extract price from the table
-        return extract_table_price(soup, metal_name, class_name)
+        return extract_table_price(soup, metal_name, class_name, metal_symbol)
         
     except Exception as e:
         logger.error(f"Error scraping price for {metal_name}: {e}")
@@ -184,115 +191,133 @@ def extract_table_price_old(soup, metal_name, class_name):
         return None
     
 
-def extract_table_price(soup, metal_name, class_name):
+def extract_table_price(soup, metal_name, class_name, metal_symbol=None):
     """
     Extract spot price from table for specified metal and price type.
     
+    The regex, class lookup and row walk strategies are tried starting with
+    whichever last succeeded for this metal, so a page normally costs a
+    single traversal.
+    
     Args:
         soup: BeautifulSoup object containing the webpage
         metal_name: String, either 'gold' or 'silver'
         class_name: String, CSS class name for the price cell
+        metal_symbol: String, optional key for strategy stats e.g. 'XAU'.
+                      Defaults to class_name.
     
     Returns:
         Float: The price value or None if not found
     """
     try:
-        # Look for the price directly in the HTML content
-        html_content = str(soup)
+        price = EXTRACTION_STRATEGIES.run(metal_symbol or class_name, soup, metal_name, class_name)
+        if price is not None:
+            logger.info("Found %s price: £%s", metal_name, price,
+                        extra={"source": "atkinsons", "event": "price_found"})
+            return price
         
-        # Determine the pattern based on metal name and class name
-        if 'gold' in metal_name.lower():
-            if 'grams' in class_name:
-                pattern = r'js-lp-gold-grams["\']>£?([\d,\.]+)<'
-            else:
-                pattern = r'js-lp-gold-toz["\']>£?([\d,\.]+)<'
-        elif 'silver' in metal_name.lower():
-            if 'grams' in class_name:
-                pattern = r'js-lp-silver-grams["\']>£?([\d,\.]+)<'
-            else:
-                pattern = r'js-lp-silver-toz["\']>£?([\d,\.]+)<'
+        logger.warning(f"Could not extract price for {metal_name}")
+        return None
+    except Exception as e:
+        logger.error(f"Error extracting table price for {metal_name}: {e}")
+        return None
+
+def get_strategy_stats():
+    """Per-symbol success and latency stats for each extraction strategy"""
+    return EXTRACTION_STRATEGIES.stats()
+
+def _extract_by_regex(soup, metal_name, class_name):
+    """Look for the price directly in the HTML content"""
+    html_content = str(soup)
+    
+    # Determine the pattern based on metal name and class name
+    if 'gold' in metal_name.lower():
+        if 'grams' in class_name:
+            pattern = r'js-lp-gold-grams["\']>£?([\d,\.]+)<'
         else:
-            logger.warning(f"Unknown metal name: {metal_name}")
-            return None
-        
-        match = re.search(pattern, html_content)
-        if match:
-            price_str = match.group(1).replace(',', '')
-            try:
-                price = float(price_str)
-                logger.info(f"Found {metal_name} price: £{price}")
-                return price
-            except ValueError:
-                logger.error(f"Could not convert '{price_str}' to float")
-                return None
+            pattern = r'js-lp-gold-toz["\']>£?([\d,\.]+)<'
+    elif 'silver' in metal_name.lower():
+        if 'grams' in class_name:
+            pattern = r'js-lp-silver-grams["\']>£?([\d,\.]+)<'
+        else:
+            pattern = r'js-lp-silver-toz["\']>£?([\d,\.]+)<'
+    else:
+        logger.warning(f"Unknown metal name: {metal_name}")
+        return None
+    
+    match = re.search(pattern, html_content)
+    if not match:
+        return None
+    
+    price_str = match.group(1).replace(',', '')
+    try:
+        return float(price_str)
+    except ValueError:
+        logger.error(f"Could not convert '{price_str}' to float")
+        return None
+
+def _extract_by_class(soup, metal_name, class_name):
+    """Find the price cell directly using the class name"""
+    return _price_from_cell(soup.find('td', class_=class_name))
+
+def _extract_by_row(soup, metal_name, class_name):
+    """Find the metal's row in the spot price table and pick the cell by unit"""
+    table = soup.find('table', {'data-lp': 'spotPrice'})
+    if not table:
+        logger.debug("Price table not found for %s", metal_name)
+        return None
         
-        # If regex approach failed, try the traditional approach
-        logger.warning(f"Regex search failed for {metal_name}, trying traditional approach")
+    # Find the row containing the metal name
+    metal_row = None
+    for row in table.find_all('tr'):
+        th = row.find('th')
+        if th and metal_name.lower() in th.text.lower():
+            metal_row = row
+            break
+    
+    if not metal_row:
+        logger.debug("Row for %s not found", metal_name)
+        return None
         
-        # Find the price cell directly using the class name
-        price_cell = soup.find('td', class_=class_name)
+    # Determine which cell to use based on class_name suffix
+    cells = metal_row.find_all('td')
+    if not cells or len(cells) < 2:
+        logger.debug("Not enough price cells found for %s", metal_name)
+        return None
         
-        if not price_cell:
-            logger.warning(f"Could not find price cell with class '{class_name}', trying alternative methods")
-            
-            # Try to find the table first
-            table = soup.find('table', {'data-lp': 'spotPrice'})
-            if not table:
-                logger.warning(f"Price table not found for {metal_name}")
-                return None
-                
-            # Find the row containing the metal name
-            metal_row = None
-            for row in table.find_all('tr'):
-                th = row.find('th')
-                if th and metal_name.lower() in th.text.lower():
-                    metal_row = row
-                    break
-            
-            if not metal_row:
-                logger.warning(f"Row for {metal_name} not found")
-                return None
-                
-            # Determine which cell to use based on class_name suffix
-            cells = metal_row.find_all('td')
-            if not cells or len(cells) < 2:
-                logger.warning(f"Not enough price cells found for {metal_name}")
-                return None
-                
-            cell_index = 0  # Default to troy ounce
-            if 'grams' in class_name:
-                cell_index = 1  # Use gram price
-                
-            price_cell = cells[cell_index]
+    cell_index = 0  # Default to troy ounce
+    if 'grams' in class_name:
+        cell_index = 1  # Use gram price
         
-        # Extract text from the cell
-        if price_cell:
-            price_text = price_cell.get_text(strip=True)
-            if not price_text:
-                logger.warning("Price cell contains no text (possibly a loading SVG)")
-                return None
-            
-            # Extract the price - handle both £1,234.56 and £1234.56 formats
-            match = re.search(r'£?([\d,]+\.\d+)', price_text)
-            if match:
-                # Remove commas for proper float conversion
-                price = float(match.group(1).replace(',', ''))
-                logger.info(f"Found {metal_name} price: £{price}")
-                return price
-                
-        logger.warning(f"Could not extract price for {metal_name}")
+    return _price_from_cell(cells[cell_index])
+
+def _price_from_cell(price_cell):
+    """Extract the price from a table cell - handles both £1,234.56 and £1234.56 formats"""
+    if not price_cell:
         return None
-    except Exception as e:
-        logger.error(f"Error extracting table price for {metal_name}: {e}")
+    
+    price_text = price_cell.get_text(strip=True)
+    if not price_text:
+        logger.debug("Price cell contains no text (possibly a loading SVG)")
         return None
+    
+    match = re.search(r'£?([\d,]+\.\d+)', price_text)
+    if match:
+        # Remove commas for proper float conversion
+        return float(match.group(1).replace(',', ''))
+    return None
+
+# Extraction strategies in default order; the last successful one is tried first
+EXTRACTION_STRATEGIES = AdaptiveStrategies('atkinsons', [
+    ('regex', _extract_by_regex),
+    ('class', _extract_by_class),
+    ('row', _extract_by_row),
+])
 
 # For testing this module in isolation
 if __name__ == "__main__":
     # Set up logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    configure_logging()
     
     # Use the get_all_prices function with logging mode
     get_all_prices("logging")
\ No newline at end of file
@@ -4,12 +4,14 @@ This handles JavaScript-rendered content without browser dependencies.
 """
 
 import cloudscraper
+import os
 import re
 import json
 import time
 from datetime import datetime
 from bs4 import BeautifulSoup
 import logging
+from snapshot_log import SnapshotLog
 
 # Configure logging
 logging.basicConfig(
@@ -199,11 +201,12 @@ if __name__ == "__main__":
         # Extract the prices
         result = extract_spot_prices()
         
-        # Save results to a file
-        with open("spot_prices.json", "w") as f:
-            json.dump(result, f, indent=2)
+        # Append the results to the snapshot log (never rewritten in place)
+        snapshot_log = SnapshotLog(os.getenv('SNAPSHOT_LOG_DIR', 'snapshots'), name="atkinsons_spot")
+        snapshot_log.append(result)
+        snapshot_log.close()
         
-        logger.info(f"Results saved to spot_prices.json")
+        logger.info(f"Results appended to {snapshot_log.segments()[-1]}")
         
         # Exit with appropriate code
         exit(0 if result["success"] else 1)
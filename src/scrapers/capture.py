@@ -0,0 +1,173 @@
+"""
+Record/replay archive of HTTP responses fetched by the scrapers
+"""
+import os
+import json
+import time
+import zlib
+import base64
+import logging
+import threading
+from collections import defaultdict, deque
+
+logger = logging.getLogger('price_scraper')
+
+# Archive segments are named capture-<epoch millis>.jsonl so they sort by age
+SEGMENT_PREFIX = "capture-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class CapturedResponse:
+    """
+    Minimal stand-in for requests.Response, served from the archive
+
+    The body may be given zlib-compressed instead; it is then only
+    decompressed when content (or text) is read, and never kept decompressed.
+    """
+
+    def __init__(self, url, status_code, headers, content=None, timestamp=None, compressed=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.timestamp = timestamp
+        self.encoding = 'utf-8'
+        self._content = content
+        self._compressed = compressed
+
+    @property
+    def content(self):
+        if self._content is None and self._compressed is not None:
+            return zlib.decompress(self._compressed)
+        return self._content if self._content is not None else b""
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+
+class CaptureWriter:
+    """
+    Append every fetched response to a rolling archive of JSON Lines segments.
+
+    Each line holds the URL, status, headers and the zlib-compressed body
+    (base64 encoded). A new segment is started once the current one exceeds
+    max_segment_bytes, and only the newest max_segments are kept on disk.
+    """
+
+    def __init__(self, archive_dir, max_segment_bytes=64 * 1024 * 1024, max_segments=48):
+        self.archive_dir = archive_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def record(self, url, response):
+        """Write a requests.Response (or CapturedResponse) to the archive"""
+        entry = {
+            "ts": time.time(),
+            "url": url,
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            "body": base64.b64encode(zlib.compress(response.content)).decode('ascii')
+        }
+        line = json.dumps(entry) + "\n"
+
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.max_segment_bytes:
+                self._roll()
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _roll(self):
+        """Start a new segment and drop the oldest ones beyond max_segments"""
+        if self._file is not None:
+            self._file.close()
+
+        self._path = os.path.join(
+            self.archive_dir, f"{SEGMENT_PREFIX}{int(time.time() * 1000)}{SEGMENT_SUFFIX}"
+        )
+        self._file = open(self._path, "a", encoding="utf-8")
+        logger.info(f"Recording HTTP responses to {self._path}")
+
+        segments = list_segments(self.archive_dir)
+        for old_segment in segments[:-self.max_segments]:
+            os.remove(old_segment)
+
+
+class ReplayArchive:
+    """
+    Serve recorded responses back without touching the network.
+
+    Responses for each URL are returned in the order they were recorded, so
+    replaying a day of captures walks through the day's pages cycle by cycle.
+    When a URL's recordings run out they start again from the beginning,
+    unless loop is False in which case None is returned.
+    """
+
+    def __init__(self, archive_dir, loop=True):
+        self.archive_dir = archive_dir
+        self.loop = loop
+        self._lock = threading.Lock()
+        self._responses = defaultdict(list)
+        self._queues = {}
+        self.load()
+
+    def load(self):
+        """(Re)load every segment in the archive directory"""
+        responses = defaultdict(list)
+        for segment in list_segments(self.archive_dir):
+            with open(segment, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from an interrupted recording
+                        logger.warning(f"Skipping unreadable line in {segment}")
+                        continue
+                    # Bodies stay compressed until a replayed response is read
+                    responses[entry["url"]].append(CapturedResponse(
+                        entry["url"],
+                        entry["status"],
+                        entry["headers"],
+                        timestamp=entry["ts"],
+                        compressed=base64.b64decode(entry["body"])
+                    ))
+
+        with self._lock:
+            self._responses = responses
+            self._queues = {url: deque(items) for url, items in responses.items()}
+
+        logger.info(f"Loaded {self.count()} recorded responses for {len(responses)} URLs from {self.archive_dir}")
+
+    def count(self):
+        return sum(len(items) for items in self._responses.values())
+
+    def get(self, url):
+        """Return the next recorded response for url, or None if there is none"""
+        with self._lock:
+            queue = self._queues.get(url)
+            if not queue:
+                if not self.loop or not self._responses.get(url):
+                    return None
+                queue = deque(self._responses[url])
+                self._queues[url] = queue
+            return queue.popleft()
+
+
+def list_segments(archive_dir):
+    """Return archive segment paths, oldest first"""
+    if not os.path.isdir(archive_dir):
+        return []
+    names = [
+        name for name in os.listdir(archive_dir)
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+    ]
+    return [os.path.join(archive_dir, name) for name in sorted(names)]
@@ -1,14 +1,24 @@
 """
 Chards website scraper for precious metals prices
 """
-import requests
 from bs4 import BeautifulSoup
 import re
+import os
+import time
 import logging
 from .coins import CHARD_COINS  # Import from config
+from .fetch import fetch_page
+from .log_setup import configure_logging
+from .result_cache import cached
 
 logger = logging.getLogger('price_scraper')
 
+# Seconds a parsed price table is reused before the page is fetched again
+TABLE_CACHE_TTL = float(os.getenv('CHARDS_TABLE_TTL', '60'))
+
+# url -> (fetched_at, parsed price table)
+_table_cache = {}
+
 def get_all_prices(output_type=None):
     """
     Fetch prices for all CHARD_COINS from Chards
@@ -20,31 +30,42 @@ def get_all_prices(output_type=None):
     
     Returns:
         dict: Dictionary of coin prices
+    
+    Results come from the result cache when recent enough (see
+    result_cache.py); set_result_cache_enabled(False) forces fresh scrapes.
     """
-    # Set up logging if requested
+    # Set up logging if requested (queue-backed, so it stays off the hot path)
+    if output_type == "logging":
+        configure_logging()
+    
+    results = _all_prices()
+    
+    # Print results if logging mode is active
     if output_type == "logging":
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        for coin_id, entry in CHARD_COINS.items():
+            if coin_id in results:
+                print(f"The current {results[coin_id]['name']} price is: £{results[coin_id]['price']}")
+            else:
+                print(f"Could not find the price for {entry[1]}")
     
+    # Copies, so callers cannot alter the cached results
+    return {key: dict(value) for key, value in results.items()}
+
+@cached(cache_if=lambda results: len(results) == len(CHARD_COINS))
+def _all_prices():
+    """Prices of every coin that could be scraped, cached only when complete"""
     results = {}
     for coin_id in CHARD_COINS:
-        price, coin_name = update_price(coin_id)
+        # Uncached: a stale update_price entry would be re-stored here as fresh
+        price, coin_name = update_price.uncached(coin_id)
         if price:
             results[coin_id] = {
                 "price": price,
                 "name": coin_name
             }
-            
-            # Print results if logging mode is active
-            if output_type == "logging":
-                print(f"The current {coin_name} price is: £{price}")
-        elif output_type == "logging":
-            print(f"Could not find the price for {coin_name}")
-    
     return results
 
+@cached(cache_if=lambda result: result[0] is not None)
 def update_price(coin_id):
     """Fetch the price for a specific coin"""
     if coin_id not in CHARD_COINS:
@@ -55,28 +76,49 @@ def update_price(coin_id):
     coin_name = CHARD_COINS[coin_id][1]
     price_column = CHARD_COINS[coin_id][2]
     
-    price = scrape_chards_price(url, coin_name, price_column)
+    # The result cache decides when this runs, so always read the page itself;
+    # a cached table could be older than the result being refreshed
+    price = scrape_chards_price(url, coin_name, price_column, max_age=0)
     
     if price:
-        logger.info(f"Successfully scraped {coin_name} price: £{price}")
+        logger.info("Successfully scraped %s price: £%s", coin_name, price,
+                    extra={"source": "chards", "event": "price_scraped"})
         return price, coin_name
     else:
         logger.error(f"Failed to scrape {coin_name} price")
         return None, coin_name
 
-def scrape_chards_price(url, coin_name, price_column):
-    """Scrape the price from a Chards product page"""
+def scrape_chards_price(url, coin_name, price_column, max_age=None):
+    """Scrape the price from a Chards product page (max_age as for get_price_table)"""
+    table = get_price_table(url, coin_name, max_age=max_age)
+    if not table:
+        return None
+    return _table_price(table, coin_name, price_column)
+
+def get_price_table(url, coin_name, max_age=None):
+    """
+    Fetch and parse the full quantity-tier price table of a product page
+    
+    The parsed table is cached with the page for TABLE_CACHE_TTL seconds, so
+    every tier and payment column is available from a single fetch.
+    
+    Args:
+        url (str): Chards product page
+        coin_name (str): Name used in log messages
+        max_age (float, optional): Oldest cached table to accept, in seconds.
+                                   Defaults to TABLE_CACHE_TTL.
+    
+    Returns:
+        dict: Price table as returned by extract_price_table, or None
+    """
+    max_age = TABLE_CACHE_TTL if max_age is None else max_age
+    cached = _table_cache.get(url)
+    if cached and time.time() - cached[0] <= max_age:
+        return cached[1]
+    
     try:
-        # Set up headers to mimic a browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Referer': 'https://www.chards.co.uk/'
-        }
-        
-        # Make the request with a timeout
-        response = requests.get(url, headers=headers, timeout=10)
+        # Fetch through the shared layer (live, record or replay)
+        response = fetch_page(url, referer='https://www.chards.co.uk/', source='chards')
         
         # Check if request was successful
         if response.status_code != 200:
@@ -86,64 +128,148 @@ def scrape_chards_price(url, coin_name, price_column):
         # Parse the HTML
         soup = BeautifulSoup(response.text, 'html.parser')
         
-        # Extract price from the table
-        return extract_table_price(soup, coin_name, price_column)
+        # Parse every tier of the price table in one pass
+        table = extract_price_table(soup, coin_name)
+        if table:
+            _table_cache[url] = (time.time(), table)
+        return table
         
     except Exception as e:
         logger.error(f"Error scraping price for {coin_name}: {e}")
         return None
 
-def extract_table_price(soup, coin_name, price_column):
-    """Extract price from table based on specified column index"""
+def get_tier_price(coin_id, quantity=1, price_column=None):
+    """
+    Price per coin for an order of a given quantity
+    
+    Args:
+        coin_id (str): Key in CHARD_COINS
+        quantity (int): Number of coins in the order
+        price_column (int, optional): Payment column; defaults to the
+                                      coin's configured column
+    
+    Returns:
+        float: Price for the matching quantity band, or None
+    """
+    if coin_id not in CHARD_COINS:
+        logger.error(f"Unknown coin ID: {coin_id}")
+        return None
+    
+    url, coin_name, default_column = CHARD_COINS[coin_id]
+    table = get_price_table(url, coin_name)
+    if not table:
+        return None
+    
+    price_column = default_column if price_column is None else price_column
+    tier = None
+    for candidate in table["tiers"]:
+        if candidate["min_quantity"] is not None and candidate["min_quantity"] <= quantity:
+            if tier is None or candidate["min_quantity"] > tier["min_quantity"]:
+                tier = candidate
+    if tier is None:
+        logger.warning(f"No quantity band for {quantity} x {coin_name}")
+        return None
+    
+    prices = tier["prices"]
+    return prices[price_column] if price_column < len(prices) else None
+
+def extract_price_table(soup, coin_name):
+    """
+    Parse the whole quantity-tier price table in a single traversal
+    
+    Args:
+        soup: BeautifulSoup object containing the product page
+        coin_name: Name used in log messages
+    
+    Returns:
+        dict: {"columns": [header text, ...],
+               "tiers": [{"quantity": "1+", "min_quantity": 1,
+                          "prices": [float or None per td cell]}, ...]}
+              Price indexes match the td cells, i.e. the price_column
+              values in CHARD_COINS. None if the table is missing.
+    """
     try:
         # Find the price table
         table = soup.find('table', {'aria-labelledby': 'table-title'})
         if not table:
             logger.warning(f"Price table not found for {coin_name}")
             return None
+        
+        columns = []
+        tiers = []
+        for row in table.find_all('tr'):
+            cells = row.find_all('td')
+            if not cells:
+                # Header row
+                if not columns:
+                    columns = [cell.get_text(strip=True) for cell in row.find_all('th')]
+                continue
             
-        # Find the first row after header (which has the '1+' quantity)
-        rows = table.find_all('tr')
-        if len(rows) < 2:  # Need at least header + data row
-            logger.warning(f"Price rows not found for {coin_name}")
-            return None
+            # The quantity band is in a row header if there is one, else the first cell
+            label_cell = row.find('th') or cells[0]
+            quantity = label_cell.get_text(strip=True)
+            band = re.search(r'\d+', quantity.replace(',', ''))
+            prices = [_parse_price(cell.get_text(strip=True)) for cell in cells]
+            if not band and not any(prices):
+                # A header row made of td cells
+                if not columns:
+                    columns = [cell.get_text(strip=True) for cell in row.find_all(['th', 'td'])]
+                continue
             
-        # First data row (index 1, after the header)
-        data_row = rows[1]
-        
-        # Get the cells in the row
-        cells = data_row.find_all('td')
+            tiers.append({
+                "quantity": quantity,
+                "min_quantity": int(band.group()) if band else None,
+                "prices": prices,
+            })
         
-        # Check if we have enough cells
-        if len(cells) <= price_column:
-            logger.warning(f"Not enough cells in the row for {coin_name} (found {len(cells)}, need > {price_column})")
+        if not tiers:
+            logger.warning(f"Price rows not found for {coin_name}")
             return None
-            
-        # Get the specified price column
-        price_cell = cells[price_column]
-        price_text = price_cell.get_text(strip=True)
         
-        # Extract the price
-        match = re.search(r'£([\d,]+\.\d+)', price_text)
-        if match:
-            # Remove commas for proper float conversion
-            price = float(match.group(1).replace(',', ''))
-            logger.info(f"Found {coin_name} price in table column {price_column}: £{price}")
-            return price
-            
-        logger.warning(f"Could not extract price from text: '{price_text}'")
-        return None
+        return {"columns": columns, "tiers": tiers}
     except Exception as e:
-        logger.error(f"Error extracting table price for {coin_name}: {e}")
+        logger.error(f"Error extracting price table for {coin_name}: {e}")
+        return None
+
+def extract_table_price(soup, coin_name, price_column):
+    """Extract price from table based on specified column index"""
+    table = extract_price_table(soup, coin_name)
+    if not table:
         return None
+    return _table_price(table, coin_name, price_column)
+
+def _table_price(table, coin_name, price_column):
+    """Price in the given column of the smallest quantity band (the '1+' row)"""
+    banded = [tier for tier in table["tiers"] if tier["min_quantity"] is not None]
+    tier = min(banded, key=lambda tier: tier["min_quantity"]) if banded else table["tiers"][0]
+    prices = tier["prices"]
+    
+    # Check if we have enough cells
+    if len(prices) <= price_column:
+        logger.warning(f"Not enough cells in the row for {coin_name} (found {len(prices)}, need > {price_column})")
+        return None
+    
+    price = prices[price_column]
+    if price is None:
+        logger.warning(f"Could not extract {coin_name} price from table column {price_column}")
+        return None
+    
+    logger.info("Found %s price in table column %s: £%s", coin_name, price_column, price,
+                extra={"source": "chards", "event": "price_found"})
+    return price
+
+def _parse_price(price_text):
+    """Extract a £1,234.56 price from cell text"""
+    match = re.search(r'£([\d,]+\.\d+)', price_text)
+    if match:
+        # Remove commas for proper float conversion
+        return float(match.group(1).replace(',', ''))
+    return None
 
 # For testing this module in isolation
 if __name__ == "__main__":
     # Set up logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    configure_logging()
     
     # Use the get_all_prices function with logging mode
     get_all_prices("logging")
\ No newline at end of file
@@ -0,0 +1,338 @@
+"""
+Incremental product catalogue discovery from dealer sitemaps
+
+CHARD_COINS lists a few hand-picked product URLs whose slugs change every
+year. DiscoveryJob keeps a JSON product registry current instead, spending
+as few requests as possible:
+    - the sitemap index is read once per run; child sitemaps are only fetched
+      when their <lastmod> has changed, and a sitemap whose content hash is
+      unchanged is not re-processed
+    - a product page is only fetched when it is new, its <lastmod> has moved,
+      or (for sitemaps without lastmod) it has not been checked for
+      recheck_after seconds
+    - a fetched page only counts as changed when its content hash differs
+Product URLs that disappear from a parsed sitemap, or whose sitemap drops
+out of the index, are marked removed.
+max_fetches caps the product pages fetched per run; newly listed URLs are
+registered straight away and the rest are fetched on later runs.
+
+Usage (from src/):
+    python -m scrapers.discovery --source chards --max-fetches 50
+"""
+import os
+import re
+import json
+import gzip
+import time
+import logging
+import argparse
+import xml.etree.ElementTree as ET
+from urllib.parse import urlparse
+from bs4 import BeautifulSoup
+from .fetch import fetch_page
+from .html_archive import content_hash
+
+logger = logging.getLogger('price_scraper')
+
+# SITEMAPS: dealer -> [sitemap (or sitemap index) URL, product URL pattern]
+SITEMAPS = {
+    "chards": ["https://www.chards.co.uk/sitemap.xml", r"^https://www\.chards\.co\.uk/[^/?#]+/(\d+)$"],
+}
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+REGISTRY_PATH = os.getenv('DISCOVERY_REGISTRY', 'catalogue.json')
+
+
+class ProductRegistry:
+    """JSON file of known product URLs and the sitemaps they came from"""
+
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self.sitemaps = {}   # sitemap url -> {"lastmod", "hash", "checked"}
+        self.products = {}   # product url -> {"source", "product_id", "slug", "name", "lastmod", "hash", ...}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.sitemaps = data.get("sitemaps", {})
+            self.products = data.get("products", {})
+
+    def save(self):
+        """Write the registry atomically"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sitemaps": self.sitemaps, "products": self.products}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def find(self, source=None, pattern=None, include_removed=False):
+        """
+        Products matching a source and a regex on their URL or name, most recently changed first
+
+        Returns:
+            list: [(url, entry)]
+        """
+        regex = re.compile(pattern, re.IGNORECASE) if pattern else None
+        matches = []
+        for url, entry in self.products.items():
+            if source and entry["source"] != source:
+                continue
+            if entry.get("removed") and not include_removed:
+                continue
+            if regex and not (regex.search(url) or regex.search(entry.get("name") or "")):
+                continue
+            matches.append((url, entry))
+        matches.sort(key=lambda item: item[1].get("last_changed") or 0, reverse=True)
+        return matches
+
+
+class DiscoveryJob:
+    """One incremental pass over a dealer's sitemap"""
+
+    def __init__(self, source, registry, max_fetches=50, recheck_after=7 * 86400):
+        """
+        Args:
+            source (str): Dealer in SITEMAPS, e.g. "chards"
+            registry (ProductRegistry): Registry updated in place
+            max_fetches (int): Product pages fetched per run at most
+            recheck_after (float): Seconds before a product without lastmod is fetched again
+        """
+        if source not in SITEMAPS:
+            raise ValueError(f"No sitemap configured for {source}")
+        self.source = source
+        self.registry = registry
+        self.max_fetches = max_fetches
+        self.recheck_after = recheck_after
+        self.sitemap_url, pattern = SITEMAPS[source]
+        self.product_pattern = re.compile(pattern)
+        self._listed_sitemaps = set()   # sitemaps listed (or read) this run
+        self._index_read = False
+        self.stats = {"requests": 0, "new": 0, "changed": 0, "unchanged": 0, "removed": 0,
+                      "deferred": 0, "failed": 0}
+
+    def run(self):
+        """
+        Read the sitemap, fetch new and changed product pages, and save the registry
+
+        Returns:
+            dict: Request and product counts for this run
+        """
+        now = time.time()
+        listed, _ = self._read_sitemaps(self.sitemap_url, now)
+        if self._index_read:
+            self._remove_unlisted_sitemaps(now)
+
+        due = []
+        for url, lastmod in listed.items():
+            entry = self.registry.products[url]
+            entry.pop("removed", None)
+            if entry.get("hash") is None:
+                # Listed but never fetched (new, or deferred by an earlier run)
+                due.append((0, url, lastmod))
+            elif lastmod and lastmod != entry.get("lastmod"):
+                due.append((1, url, lastmod))
+            elif not lastmod and now - entry.get("last_checked", 0) > self.recheck_after:
+                due.append((2, url, lastmod))
+
+        # New products first, then ones the sitemap says changed, then rechecks
+        due.sort(key=lambda item: item[0])
+        for _, url, lastmod in due[:self.max_fetches]:
+            self._check_product(url, lastmod, now)
+        self.stats["deferred"] = max(0, len(due) - self.max_fetches)
+
+        self.registry.save()
+        logger.info(f"Discovery for {self.source}: {self.stats}")
+        return self.stats
+
+    def _read_sitemaps(self, sitemap_url, now):
+        """
+        Product URLs listed by a sitemap (following sitemap indexes)
+
+        Returns:
+            tuple: (dict of product url -> lastmod (or None), whether this sitemap
+                   and every child sitemap it needed were read)
+        """
+        self._listed_sitemaps.add(sitemap_url)
+        root, unchanged = self._fetch_sitemap(sitemap_url, now)
+        if root is None:
+            # Failed: keep what it listed last time rather than marking it all removed
+            return self._known_from(sitemap_url), False
+        if sitemap_url == self.sitemap_url:
+            self._index_read = True
+
+        if root.tag == SITEMAP_NS + "sitemapindex":
+            listed = {}
+            complete = True
+            for child in root.iter(SITEMAP_NS + "sitemap"):
+                loc = _text(child, "loc")
+                if not loc:
+                    continue
+                self._listed_sitemaps.add(loc)
+                lastmod = _text(child, "lastmod")
+                known = self.registry.sitemaps.get(loc)
+                if known and lastmod and lastmod == known.get("lastmod"):
+                    # Unchanged since the last run: reuse what it listed then
+                    listed.update(self._known_from(loc))
+                    continue
+                child_listed, child_read = self._read_sitemaps(loc, now)
+                listed.update(child_listed)
+                if child_read:
+                    self.registry.sitemaps[loc]["lastmod"] = lastmod
+                else:
+                    # Left without the new lastmod so the next run fetches it again
+                    complete = False
+            return listed, complete
+
+        if unchanged:
+            return self._known_from(sitemap_url), True
+
+        listed = {}
+        for url_element in root.iter(SITEMAP_NS + "url"):
+            loc = _text(url_element, "loc")
+            if loc and self.product_pattern.match(loc):
+                listed[loc] = _text(url_element, "lastmod")
+
+        # Anything this sitemap used to list but no longer does has been removed
+        for url, entry in self.registry.products.items():
+            if entry.get("sitemap") == sitemap_url and url not in listed and not entry.get("removed"):
+                entry["removed"] = now
+                self.stats["removed"] += 1
+        for url in listed:
+            entry = self.registry.products.get(url)
+            if entry is None:
+                # Registered straight away so it survives being deferred by max_fetches
+                entry = self.registry.products[url] = self._new_entry(url, listed[url], now)
+            entry["sitemap"] = sitemap_url
+        return listed, True
+
+    def _new_entry(self, url, lastmod, now):
+        match = self.product_pattern.match(url)
+        parts = url.rstrip("/").split("/")
+        return {
+            "source": self.source,
+            "product_id": match.group(1) if match and match.groups() else None,
+            "slug": parts[-2] if match and match.groups() else parts[-1],
+            "name": None,
+            "lastmod": lastmod,
+            "hash": None,
+            "first_seen": now,
+        }
+
+    def _remove_unlisted_sitemaps(self, now):
+        """Mark removed the products of child sitemaps that the index no longer lists"""
+        for url, entry in self.registry.products.items():
+            if (entry["source"] == self.source and not entry.get("removed")
+                    and entry.get("sitemap") not in self._listed_sitemaps):
+                entry["removed"] = now
+                self.stats["removed"] += 1
+        # Forget dropped sitemaps of this dealer (other dealers' are on other hosts)
+        host = urlparse(self.sitemap_url).netloc
+        for sitemap_url in list(self.registry.sitemaps):
+            if sitemap_url not in self._listed_sitemaps and urlparse(sitemap_url).netloc == host:
+                del self.registry.sitemaps[sitemap_url]
+
+    def _fetch_sitemap(self, sitemap_url, now):
+        """
+        Fetch and parse a sitemap
+
+        Returns:
+            tuple: (root element or None on failure, whether its content hash is unchanged)
+        """
+        state = self.registry.sitemaps.setdefault(sitemap_url, {})
+        self.stats["requests"] += 1
+        try:
+            response = fetch_page(sitemap_url, source=self.source)
+        except Exception as e:
+            logger.error(f"Error fetching sitemap {sitemap_url}: {e}")
+            return None, False
+        if response.status_code != 200:
+            logger.warning(f"Sitemap {sitemap_url} returned {response.status_code}")
+            return None, False
+
+        body = response.content
+        if body[:2] == b"\x1f\x8b":
+            body = gzip.decompress(body)
+
+        try:
+            root = ET.fromstring(body)
+        except ET.ParseError as e:
+            logger.error(f"Unparseable sitemap {sitemap_url}: {e}")
+            return None, False
+
+        digest = content_hash(body)
+        unchanged = digest == state.get("hash")
+        state["hash"] = digest
+        state["checked"] = now
+        return root, unchanged
+
+    def _known_from(self, sitemap_url):
+        """Products the registry already has from a sitemap (all of the source's for the root sitemap)"""
+        return {
+            url: entry.get("lastmod")
+            for url, entry in self.registry.products.items()
+            if entry["source"] == self.source and not entry.get("removed")
+            and (sitemap_url == self.sitemap_url or entry.get("sitemap") == sitemap_url)
+        }
+
+    def _check_product(self, url, lastmod, now):
+        """Fetch one product page and record it if it is new or its content changed"""
+        self.stats["requests"] += 1
+        try:
+            response = fetch_page(url, source=self.source)
+        except Exception as e:
+            logger.error(f"Error fetching {url}: {e}")
+            self.stats["failed"] += 1
+            return
+        if response.status_code != 200:
+            logger.warning(f"{url} returned {response.status_code}")
+            self.stats["failed"] += 1
+            return
+
+        digest = content_hash(response.content)
+        entry = self.registry.products[url]
+        is_new = entry.get("hash") is None
+        entry["lastmod"] = lastmod
+        entry["last_checked"] = now
+        if digest == entry.get("hash"):
+            self.stats["unchanged"] += 1
+            return
+
+        entry["hash"] = digest
+        entry["last_changed"] = now
+        entry["name"] = _page_name(response.text) or entry.get("name")
+        self.stats["new" if is_new else "changed"] += 1
+
+
+def _text(element, tag):
+    child = element.find(SITEMAP_NS + tag)
+    if child is None or child.text is None:
+        return None
+    return child.text.strip()
+
+
+def _page_name(html):
+    """Product name from a page's <h1>, falling back to its <title>"""
+    soup = BeautifulSoup(html, 'html.parser')
+    heading = soup.find('h1')
+    if heading and heading.get_text(strip=True):
+        return heading.get_text(strip=True)
+    if soup.title and soup.title.string:
+        return soup.title.string.strip()
+    return None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Update the product registry from dealer sitemaps")
+    parser.add_argument("--source", choices=sorted(SITEMAPS), default="chards")
+    parser.add_argument("--registry", default=REGISTRY_PATH)
+    parser.add_argument("--max-fetches", type=int, default=int(os.getenv('DISCOVERY_MAX_FETCHES', '50')))
+    args = parser.parse_args()
+
+    job = DiscoveryJob(args.source, ProductRegistry(args.registry), max_fetches=args.max_fetches)
+    print(job.run())
@@ -0,0 +1,229 @@
+"""
+Shared HTTP fetch layer used by all scrapers
+
+The fetch mode is taken from the FETCH_MODE environment variable (or set with
+set_fetch_mode):
+    live   - fetch from the network (default)
+    record - fetch from the network and write every response to CAPTURE_DIR
+    replay - serve responses from CAPTURE_DIR with no network access
+
+Independently of the mode, setting HTML_ARCHIVE_DIR (or calling
+set_html_archive) keeps every fetched page in a deduplicated HtmlArchive
+for forensics when extraction fails.
+
+Network fetches are paced by an adaptive per-host rate limiter (see
+rate_limit.py) unless RATE_LIMIT_ENABLED is false.
+
+With FETCH_CONDITIONAL=true (or set_conditional_requests) pages are
+revalidated with If-None-Match / If-Modified-Since, and a 304 answer is
+served from the last 200 response. set_host_overrides points dealer hosts
+at another server, e.g. the local mock dealer used for load tests.
+"""
+import os
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+import requests
+from .capture import CaptureWriter, ReplayArchive, CapturedResponse
+from .html_archive import HtmlArchive
+from .rate_limit import get_limiter, rate_limiting_enabled
+
+logger = logging.getLogger('price_scraper')
+
+FETCH_MODES = ("live", "record", "replay")
+
+# Headers to mimic a browser
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+_state = {
+    "mode": os.getenv('FETCH_MODE', 'live'),
+    "capture_dir": os.getenv('CAPTURE_DIR', 'captures'),
+    "writer": None,
+    "replay": None,
+    "html_archive_dir": os.getenv('HTML_ARCHIVE_DIR', ''),
+    "html_archive": None,
+    "conditional": os.getenv('FETCH_CONDITIONAL', 'false').lower() in ('1', 'true', 'yes'),
+    "host_overrides": {},
+}
+_state_lock = threading.Lock()
+
+if _state["mode"] not in FETCH_MODES:
+    raise ValueError(f"Unknown FETCH_MODE: {_state['mode']} (expected one of {', '.join(FETCH_MODES)})")
+
+# url -> last 200 response, reused when the server answers 304
+_validated = {}
+
+
+def set_fetch_mode(mode, capture_dir=None):
+    """
+    Switch between live, record and replay fetching
+
+    Args:
+        mode (str): One of "live", "record" or "replay"
+        capture_dir (str, optional): Archive directory used by record/replay.
+                                     Defaults to the CAPTURE_DIR setting.
+    """
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown fetch mode: {mode} (expected one of {', '.join(FETCH_MODES)})")
+
+    with _state_lock:
+        if _state["writer"] is not None:
+            _state["writer"].close()
+        _state["mode"] = mode
+        if capture_dir:
+            _state["capture_dir"] = capture_dir
+        _state["writer"] = None
+        _state["replay"] = None
+
+
+def get_fetch_mode():
+    return _state["mode"]
+
+
+def set_conditional_requests(enabled):
+    """Revalidate pages with ETag / Last-Modified instead of refetching them"""
+    with _state_lock:
+        _state["conditional"] = enabled
+        _validated.clear()
+
+
+def set_host_overrides(overrides):
+    """
+    Send requests for some hosts to another server
+
+    Args:
+        overrides (dict): {host: base URL}, e.g.
+                          {"www.chards.co.uk": "http://127.0.0.1:8001"}.
+                          Empty or None removes all overrides.
+    """
+    with _state_lock:
+        _state["host_overrides"] = dict(overrides or {})
+
+
+def set_html_archive(archive_dir):
+    """Archive every fetched page under archive_dir (None or "" to disable)"""
+    with _state_lock:
+        _state["html_archive_dir"] = archive_dir or ''
+        _state["html_archive"] = None
+
+
+def get_html_archive():
+    """Return the active HtmlArchive, or None if page archiving is disabled"""
+    with _state_lock:
+        if not _state["html_archive_dir"]:
+            return None
+        if _state["html_archive"] is None:
+            _state["html_archive"] = HtmlArchive(_state["html_archive_dir"])
+        return _state["html_archive"]
+
+
+def fetch_page(url, referer=None, timeout=10, source=None):
+    """
+    Fetch a page using the current fetch mode
+
+    Args:
+        url (str): Page to fetch
+        referer (str, optional): Referer header to send
+        timeout (int): Request timeout in seconds
+        source (str, optional): Dealer name used when archiving the page.
+                                Defaults to the URL's host.
+
+    Returns:
+        Response object with status_code, headers, content and text.
+        In replay mode a 404 response is returned for unrecorded URLs.
+    """
+    mode = _state["mode"]
+
+    if mode == "replay":
+        response = _get_replay_archive().get(url)
+        if response is None:
+            logger.error(f"No recorded response for {url}")
+            return _missing_response(url)
+        return response
+
+    headers = dict(DEFAULT_HEADERS)
+    if referer:
+        headers['Referer'] = referer
+
+    cached = _validated.get(url) if _state["conditional"] else None
+    if cached is not None:
+        if cached.headers.get('ETag'):
+            headers['If-None-Match'] = cached.headers['ETag']
+        if cached.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = cached.headers['Last-Modified']
+
+    request_url = _apply_host_override(url)
+    limiter = get_limiter(request_url) if rate_limiting_enabled() else None
+    if limiter is not None:
+        limiter.acquire()
+
+    # Make the request with a timeout
+    start = time.perf_counter()
+    try:
+        response = requests.get(request_url, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        if limiter is not None:
+            limiter.feedback(None, time.perf_counter() - start)
+        raise
+    if limiter is not None:
+        limiter.feedback(response.status_code, time.perf_counter() - start, response.headers.get('Retry-After'))
+
+    revalidated = False
+    if _state["conditional"]:
+        if response.status_code == 304 and cached is not None:
+            # Unchanged since the last fetch, serve the stored copy
+            response = cached
+            revalidated = True
+        elif response.status_code == 200 and (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+            _validated[url] = response
+
+    if mode == "record":
+        try:
+            _get_capture_writer().record(url, response)
+        except OSError as e:
+            logger.error(f"Could not record response for {url}: {e}")
+
+    if response.status_code == 200 and not revalidated:
+        archive = get_html_archive()
+        if archive is not None:
+            try:
+                archive.add(source or urlparse(url).netloc, url, response.content)
+            except OSError as e:
+                logger.error(f"Could not archive page {url}: {e}")
+
+    return response
+
+
+def _apply_host_override(url):
+    overrides = _state["host_overrides"]
+    if not overrides:
+        return url
+    parsed = urlparse(url)
+    base = overrides.get(parsed.netloc)
+    if base is None:
+        return url
+    target = urlparse(base)
+    return parsed._replace(scheme=target.scheme, netloc=target.netloc).geturl()
+
+
+def _get_capture_writer():
+    with _state_lock:
+        if _state["writer"] is None:
+            _state["writer"] = CaptureWriter(_state["capture_dir"])
+        return _state["writer"]
+
+
+def _get_replay_archive():
+    with _state_lock:
+        if _state["replay"] is None:
+            _state["replay"] = ReplayArchive(_state["capture_dir"])
+        return _state["replay"]
+
+
+def _missing_response(url):
+    return CapturedResponse(url, 404, {}, b"")
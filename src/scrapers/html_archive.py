@@ -0,0 +1,229 @@
+"""
+Content-addressed, deduplicated archive of raw fetched pages
+
+Every body is identified by its SHA-256. A body that is already in the archive
+costs only an index line. New bodies are stored zlib-compressed, and when an
+earlier version of the same (source, url) exists they are stored as a
+line-level delta against it, so near-identical pages (same page, new prices)
+take a few hundred bytes rather than a full copy.
+
+Layout:
+    <archive_dir>/index.jsonl          one line per fetch: source, url, ts, hash, size
+    <archive_dir>/objects/ab/<hash>    compressed full body or delta
+"""
+import os
+import json
+import time
+import zlib
+import bisect
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger('price_scraper')
+
+# Store a full copy after this many chained deltas so reads stay cheap
+MAX_DELTA_DEPTH = 20
+
+
+def content_hash(body):
+    """SHA-256 hex digest of a page body (bytes)"""
+    return hashlib.sha256(body).hexdigest()
+
+
+class HtmlArchive:
+    """Deduplicated page store with a (source, url, timestamp) -> hash index"""
+
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        self.index_path = os.path.join(archive_dir, "index.jsonl")
+        self._lock = threading.Lock()
+        # (source, url) -> sorted list of (timestamp, hash)
+        self._index = {}
+        # hash -> delta depth of the stored object
+        self._depths = {}
+        self.logical_bytes = 0
+        os.makedirs(os.path.join(archive_dir, "objects"), exist_ok=True)
+        self._load_index()
+
+    def add(self, source, url, body, timestamp=None):
+        """
+        Archive a fetched body
+
+        Args:
+            source (str): Dealer the page came from, e.g. "chards"
+            url (str): Page URL
+            body (bytes): Raw response body
+            timestamp (float, optional): Fetch time, defaults to now
+
+        Returns:
+            str: Content hash of the body
+        """
+        timestamp = timestamp or time.time()
+        digest = content_hash(body)
+
+        with self._lock:
+            if not self._has_object(digest):
+                self._write_object(digest, body, self._latest_hash(source, url))
+
+            entry = {"source": source, "url": url, "ts": timestamp, "hash": digest, "size": len(body)}
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._add_to_index(entry)
+
+        return digest
+
+    def lookup(self, source, url, at=None):
+        """
+        Find the hash of the page fetched for (source, url) at or before a time
+
+        Args:
+            at (float, optional): Timestamp; defaults to the latest fetch
+
+        Returns:
+            str: Content hash, or None if nothing was archived by then
+        """
+        with self._lock:
+            entries = self._index.get((source, url))
+            if not entries:
+                return None
+            if at is None:
+                return entries[-1][1]
+            position = bisect.bisect_right(entries, (at, chr(0x10FFFF)))
+            return entries[position - 1][1] if position else None
+
+    def history(self, source, url):
+        """Return [(timestamp, hash), ...] for every archived fetch of a page"""
+        with self._lock:
+            return list(self._index.get((source, url), []))
+
+    def read(self, digest):
+        """Return the original body (bytes) for a content hash"""
+        header, payload = self._read_object(digest)
+        if header["type"] == "full":
+            return payload
+
+        # Rebuild from the base version plus the line delta
+        base_lines = self.read(header["base"]).splitlines(keepends=True)
+        parts = []
+        for op in json.loads(payload):
+            if op[0] == "c":
+                parts.extend(base_lines[op[1]:op[1] + op[2]])
+            else:
+                parts.append(op[1].encode("utf-8", errors="surrogateescape"))
+        return b"".join(parts)
+
+    def stats(self):
+        """Bytes fetched versus bytes actually stored on disk"""
+        stored = 0
+        objects_dir = os.path.join(self.archive_dir, "objects")
+        for root, _, files in os.walk(objects_dir):
+            stored += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return {
+            "fetches": sum(len(entries) for entries in self._index.values()),
+            "objects": len(self._depths),
+            "logical_bytes": self.logical_bytes,
+            "stored_bytes": stored,
+        }
+
+    def _object_path(self, digest):
+        return os.path.join(self.archive_dir, "objects", digest[:2], digest)
+
+    def _has_object(self, digest):
+        return digest in self._depths or os.path.exists(self._object_path(digest))
+
+    def _latest_hash(self, source, url):
+        entries = self._index.get((source, url))
+        return entries[-1][1] if entries else None
+
+    def _write_object(self, digest, body, base_digest):
+        header = {"type": "full"}
+        payload = body
+
+        if base_digest is not None and self._depths.get(base_digest, MAX_DELTA_DEPTH) < MAX_DELTA_DEPTH:
+            try:
+                base_body = self.read(base_digest)
+                header = {"type": "delta", "base": base_digest, "depth": self._depths[base_digest] + 1}
+                payload = json.dumps(_line_delta(base_body, body)).encode("utf-8")
+            except (OSError, zlib.error, ValueError) as e:
+                logger.warning(f"Could not delta {digest[:12]} against {base_digest[:12]}, storing in full: {e}")
+                header = {"type": "full"}
+                payload = body
+
+        path = self._object_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a torn object
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(json.dumps(header).encode("utf-8") + b"\n" + payload, 9))
+        os.replace(tmp_path, path)
+        self._depths[digest] = header.get("depth", 0)
+
+    def _read_object(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            data = zlib.decompress(f.read())
+        header_line, payload = data.split(b"\n", 1)
+        return json.loads(header_line), payload
+
+    def _add_to_index(self, entry):
+        entries = self._index.setdefault((entry["source"], entry["url"]), [])
+        item = (entry["ts"], entry["hash"])
+        if not entries or item >= entries[-1]:
+            entries.append(item)
+        else:
+            bisect.insort(entries, item)
+        self.logical_bytes += entry.get("size", 0)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable line in {self.index_path}")
+                    continue
+                self._add_to_index(entry)
+                if entry["hash"] not in self._depths and os.path.exists(self._object_path(entry["hash"])):
+                    header, _ = self._read_object(entry["hash"])
+                    self._depths[entry["hash"]] = header.get("depth", 0)
+
+
+def _line_delta(base, body):
+    """
+    Encode body as copies of line ranges from base plus inserted lines
+
+    Returns a list of ["c", base_start, count] and ["i", text] operations.
+    Lines are matched greedily, which is linear in the page size and works
+    well when only a handful of lines (prices, tokens) change between fetches.
+    """
+    base_lines = base.splitlines(keepends=True)
+    new_lines = body.splitlines(keepends=True)
+
+    first_seen = {}
+    for i, line in enumerate(base_lines):
+        first_seen.setdefault(line, i)
+
+    ops = []
+    i = 0
+    while i < len(new_lines):
+        start = first_seen.get(new_lines[i])
+        if start is None:
+            text = new_lines[i].decode("utf-8", errors="surrogateescape")
+            if ops and ops[-1][0] == "i":
+                ops[-1][1] += text
+            else:
+                ops.append(["i", text])
+            i += 1
+            continue
+
+        # Extend the copy while the following lines keep matching
+        count = 1
+        while (i + count < len(new_lines) and start + count < len(base_lines)
+               and new_lines[i + count] == base_lines[start + count]):
+            count += 1
+        ops.append(["c", start, count])
+        i += count
+
+    return ops
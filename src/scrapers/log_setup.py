@@ -0,0 +1,120 @@
+"""
+Non-blocking logging for the scrapers
+
+configure_logging() routes the shared 'price_scraper' logger through a queue:
+worker threads only put the record on an in-memory queue, and a single
+QueueListener thread formats it and writes it to stderr (and LOG_FILE if
+set). Records are queued unformatted, so the message is only built by the
+listener, and only for records that are actually written.
+
+Hot-path messages are logged %-style with structured fields in extra:
+    logger.info("Found %s price: £%s", name, price,
+                extra={"source": "chards", "event": "price_found"})
+Repetitive success events (SAMPLED_EVENTS) are sampled per source: one in
+LOG_SAMPLE_EVERY is written. Warnings and errors are never sampled.
+"""
+import os
+import sys
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger('price_scraper')
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Success events written only one time in LOG_SAMPLE_EVERY, per source
+SAMPLED_EVENTS = ("price_found", "price_scraped")
+
+_state = {"handler": None, "listener": None}
+_lock = threading.Lock()
+
+
+class SuccessSampler(logging.Filter):
+    """Let through one in `every` INFO-or-lower records of each (source, sampled event)"""
+
+    def __init__(self, every=10, events=SAMPLED_EVENTS):
+        super().__init__()
+        self.every = max(1, every)
+        self.events = frozenset(events)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event not in self.events or record.levelno > logging.INFO:
+            return True
+        key = (getattr(record, "source", None), event)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue records as they are; the listener formats them"""
+
+    def prepare(self, record):
+        # The queue never leaves the process, so the record (and its args)
+        # can be handed over without formatting or pickling it here
+        return record
+
+
+def configure_logging(level=None, log_file=None, sample_every=None, fmt=DEFAULT_FORMAT):
+    """
+    Send 'price_scraper' records through a background writer (safe to call repeatedly)
+
+    Args:
+        level (str or int, optional): Logger level. Defaults to LOG_LEVEL or INFO.
+        log_file (str, optional): Also write to this file. Defaults to LOG_FILE.
+        sample_every (int, optional): Keep one in N sampled success records.
+                                      Defaults to LOG_SAMPLE_EVERY or 10.
+        fmt (str): Record format
+
+    Returns:
+        logging.Logger: The configured 'price_scraper' logger
+    """
+    with _lock:
+        if _state["listener"] is not None:
+            return logger
+
+        level = level or os.getenv('LOG_LEVEL', 'INFO')
+        log_file = log_file if log_file is not None else os.getenv('LOG_FILE')
+        sample_every = sample_every or int(os.getenv('LOG_SAMPLE_EVERY', '10'))
+
+        formatter = logging.Formatter(fmt)
+        handlers = [logging.StreamHandler(sys.stderr)]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        records = queue.SimpleQueue()
+        queue_handler = _DeferredQueueHandler(records)
+        queue_handler.addFilter(SuccessSampler(sample_every))
+        listener = QueueListener(records, *handlers, respect_handler_level=True)
+
+        logger.addHandler(queue_handler)
+        logger.setLevel(level)
+        # Root handlers would write synchronously on the calling thread
+        logger.propagate = False
+        listener.start()
+
+        _state["handler"] = queue_handler
+        _state["listener"] = listener
+        atexit.register(stop_logging)
+        return logger
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer"""
+    with _lock:
+        listener, handler = _state["listener"], _state["handler"]
+        if listener is None:
+            return
+        listener.stop()
+        logger.removeHandler(handler)
+        logger.propagate = True
+        _state["handler"] = _state["listener"] = None
@@ -0,0 +1,33 @@
+"""
+Canonical products shared across dealers
+
+Each dealer lists the same coin under its own ID and URL (see CHARD_COINS).
+CANONICAL_PRODUCTS maps those dealer-specific keys onto one canonical
+product so prices can be compared across dealers.
+"""
+
+# CANONICAL_PRODUCTS: Dictionary of canonical products with their name, metal,
+# fine weight in troy ounces, and the key each dealer uses for them
+CANONICAL_PRODUCTS = {
+    "gold_sovereign_2025": ["2025 Gold Sovereign", "gold", 0.2354, {"chards": "sovereign"}],
+    "gold_britannia_1oz_2025": ["2025 Gold Britannia 1 oz", "gold", 1.0, {"chards": "gold_britannia"}],
+    "silver_britannia_1oz_2025": ["2025 Silver Britannia 1 oz", "silver", 1.0, {"chards": "silver_britannia"}],
+}
+
+# Reverse lookup: (dealer, dealer key) -> canonical product id
+DEALER_PRODUCTS = {
+    (dealer, dealer_key): product_id
+    for product_id, (_, _, _, listings) in CANONICAL_PRODUCTS.items()
+    for dealer, dealer_key in listings.items()
+}
+
+
+def canonical_product(dealer, dealer_key):
+    """Return the canonical product id for a dealer's product key, or None"""
+    return DEALER_PRODUCTS.get((dealer, dealer_key))
+
+
+def weight_class(product_id):
+    """Return the (metal, weight in troy oz) class of a canonical product"""
+    _, metal, weight, _ = CANONICAL_PRODUCTS[product_id]
+    return metal, weight
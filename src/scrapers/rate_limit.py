@@ -0,0 +1,151 @@
+"""
+Adaptive per-host rate limiting for dealer sites
+
+Each host gets a token bucket whose refill rate follows AIMD:
+    - additive increase while responses are healthy
+    - multiplicative decrease on 403 / 429 / 503, request errors, or when
+      latency rises well above the host's baseline
+    - other 4xx / 5xx responses leave the rate as it is
+A Retry-After header pauses the host entirely for the requested time.
+This lets concurrent fetching run as fast as each site tolerates without
+tripping its defences.
+"""
+import os
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+
+logger = logging.getLogger('price_scraper')
+
+# Status codes that mean "slow down" (the dealer sites answer bots with 403)
+THROTTLE_STATUSES = (403, 429, 503)
+
+# Per-host defaults; RATE_LIMIT_INITIAL / RATE_LIMIT_MAX, when set, take precedence
+HOST_LIMITS = {
+    "www.chards.co.uk": {"initial_rate": 1.0, "max_rate": 5.0},
+    "www.atkinsonsbullion.com": {"initial_rate": 1.0, "max_rate": 5.0},
+}
+
+
+class HostRateLimiter:
+    """Token bucket for one host with an AIMD-controlled rate (requests/second)"""
+
+    def __init__(self, host, initial_rate=1.0, min_rate=0.05, max_rate=10.0, burst=2.0,
+                 increase=0.05, decrease=0.5, latency_factor=2.5, cooldown=2.0):
+        """
+        Args:
+            host (str): Host name, used in logs
+            initial_rate, min_rate, max_rate (float): Requests per second
+            burst (float): Bucket capacity in requests
+            increase (float): Rate added per healthy response
+            decrease (float): Rate multiplier when the host pushes back
+            latency_factor (float): Latency this many times the baseline counts as pushback
+            cooldown (float): Minimum seconds between two decreases
+        """
+        self.host = host
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._latency = None
+        self._baseline = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request to this host is allowed"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(min(wait, 1.0))
+
+    def feedback(self, status_code=None, latency=None, retry_after=None):
+        """
+        Adjust the rate from the outcome of a request
+
+        Args:
+            status_code (int, optional): HTTP status, or None if the request failed
+            latency (float, optional): Seconds the request took
+            retry_after (str, optional): Retry-After header value
+        """
+        with self._lock:
+            now = time.monotonic()
+            slow = self._track_latency(latency)
+
+            if status_code is None or status_code in THROTTLE_STATUSES or slow:
+                pause = _parse_retry_after(retry_after)
+                if pause:
+                    self._paused_until = max(self._paused_until, now + pause)
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    old_rate = self.rate
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    reason = f"status {status_code}" if not slow else f"latency {latency:.2f}s"
+                    logger.warning(f"Throttling {self.host}: {reason}, rate {old_rate:.2f} -> {self.rate:.2f} req/s")
+            elif status_code < 400:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _track_latency(self, latency):
+        """Update the latency EWMA and report whether it is well above baseline"""
+        if latency is None:
+            return False
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        # The baseline follows improvements immediately and degradations slowly
+        if self._baseline is None or self._latency < self._baseline:
+            self._baseline = self._latency
+        else:
+            self._baseline = 0.99 * self._baseline + 0.01 * self._latency
+        return self._latency > self._baseline * self.latency_factor
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url_or_host):
+    """Return the shared HostRateLimiter for a URL or host name"""
+    host = urlparse(url_or_host).netloc or url_or_host
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            settings = {"initial_rate": 1.0, "max_rate": 10.0}
+            settings.update(HOST_LIMITS.get(host, {}))
+            if os.getenv('RATE_LIMIT_INITIAL'):
+                settings["initial_rate"] = float(os.getenv('RATE_LIMIT_INITIAL'))
+            if os.getenv('RATE_LIMIT_MAX'):
+                settings["max_rate"] = float(os.getenv('RATE_LIMIT_MAX'))
+            limiter = HostRateLimiter(host, **settings)
+            _limiters[host] = limiter
+        return limiter
+
+
+def rate_limiting_enabled():
+    return os.getenv('RATE_LIMIT_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+
+def _parse_retry_after(value):
+    """Seconds from a Retry-After header (only the delta-seconds form)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
@@ -0,0 +1,156 @@
+"""
+In-process result cache for scraper calls
+
+@cached memoises a function on its arguments with:
+    - a TTL: results younger than ttl seconds are returned as they are
+    - stale-while-revalidate: for stale_ttl seconds after that the cached
+      result is still returned at once, while one background refresh runs
+    - coalescing: concurrent callers missing the same key share one call
+    - a bounded size with least-recently-used eviction
+Results rejected by cache_if (e.g. failed scrapes) are never cached, so
+failures are retried on the next call.
+
+The undecorated function stays available as <function>.uncached, and
+set_result_cache_enabled(False) (or RESULT_CACHE_ENABLED=false) bypasses
+every cache, e.g. for load tests that must measure real fetches.
+"""
+import os
+import time
+import logging
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger('price_scraper')
+
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', '30'))  # In seconds
+RESULT_CACHE_STALE = float(os.getenv('RESULT_CACHE_STALE', '300'))  # In seconds, after the TTL
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '256'))
+
+_state = {"enabled": os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'}
+_caches = []
+_refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+
+def set_result_cache_enabled(enabled):
+    """Turn every result cache on or off (off calls straight through)"""
+    _state["enabled"] = bool(enabled)
+
+
+def result_cache_enabled():
+    return _state["enabled"]
+
+
+def clear_result_caches():
+    """Drop every cached result"""
+    for cache in _caches:
+        cache.clear()
+
+
+class ResultCache:
+    """TTL + LRU cache of one function's results, keyed by its arguments"""
+
+    def __init__(self, function, ttl=None, stale_ttl=None, max_size=None, cache_if=None):
+        """
+        Args:
+            function (callable): Function whose results are cached
+            ttl (float, optional): Seconds a result is fresh. Defaults to RESULT_CACHE_TTL.
+            stale_ttl (float, optional): Further seconds a stale result is served while
+                                         it is refreshed. Defaults to RESULT_CACHE_STALE.
+            max_size (int, optional): Entries kept. Defaults to RESULT_CACHE_SIZE.
+            cache_if (callable, optional): cache_if(result) -> bool, whether to cache a result
+        """
+        self.function = function
+        self.ttl = RESULT_CACHE_TTL if ttl is None else ttl
+        self.stale_ttl = RESULT_CACHE_STALE if stale_ttl is None else stale_ttl
+        self.max_size = RESULT_CACHE_SIZE if max_size is None else max_size
+        self.cache_if = cache_if
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "evictions": 0}
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (stored_at, result), least recently used first
+        self._in_flight = {}            # key -> Future of the call loading it
+
+    def get(self, *args, **kwargs):
+        """Return the function's result for these arguments, from the cache where possible"""
+        if not _state["enabled"]:
+            return self.function(*args, **kwargs)
+
+        key = (args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry[0]
+                if age <= self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    if age <= self.ttl:
+                        self.stats["hits"] += 1
+                    else:
+                        # Serve the stale result now and refresh it once in the background
+                        self.stats["stale"] += 1
+                        if key not in self._in_flight:
+                            self.stats["refreshes"] += 1
+                            future = self._in_flight[key] = Future()
+                            _refresher.submit(self._load, key, args, kwargs, future)
+                    return entry[1]
+
+            future = self._in_flight.get(key)
+            loading = future is None
+            if loading:
+                self.stats["misses"] += 1
+                future = self._in_flight[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+
+        if loading:
+            self._load(key, args, kwargs, future)
+        return future.result()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self, key, args, kwargs, future):
+        try:
+            result = self.function(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            logger.error(f"Error loading {self.function.__name__}{args}: {e}")
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            if self.cache_if is None or self.cache_if(result):
+                self._entries[key] = (time.monotonic(), result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.stats["evictions"] += 1
+            self._in_flight.pop(key, None)
+        future.set_result(result)
+
+
+def cached(ttl=None, stale_ttl=None, max_size=None, cache_if=None):
+    """
+    Decorator caching a function's results in a ResultCache
+
+    The wrapper exposes the cache as .cache and the original function as .uncached.
+    """
+    def decorator(function):
+        cache = ResultCache(function, ttl=ttl, stale_ttl=stale_ttl, max_size=max_size, cache_if=cache_if)
+        _caches.append(cache)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            return cache.get(*args, **kwargs)
+
+        wrapper.cache = cache
+        wrapper.uncached = function
+        return wrapper
+
+    return decorator
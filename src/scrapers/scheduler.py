@@ -0,0 +1,183 @@
+"""
+Volatility-adaptive polling intervals per symbol
+
+Instead of one fixed SCRAPE_INTERVAL for every source, each (dealer, symbol)
+gets its own poll interval derived from how much and how often its price
+has been moving:
+    - an EWMA of absolute log returns, scaled to per-sqrt-second volatility,
+      sets the interval at which the expected move is about target_move
+    - pages whose price rarely changes back off geometrically
+    - intervals grow by at most `growth` per poll but can tighten quickly,
+      and always stay within the dealer's [min, max] bounds
+Quiet coin pages drift towards their maximum interval while XAU/XAG tighten
+when the market moves.
+"""
+import os
+import math
+import time
+import logging
+import threading
+
+logger = logging.getLogger('price_scraper')
+
+# Per-dealer interval bounds in seconds: dealer -> (min, max)
+INTERVAL_BOUNDS = {
+    "atkinsons": (60, 3600),
+    "chards": (300, 6 * 3600),
+}
+
+
+def bounds_from_env():
+    """
+    Interval bounds overridden by POLL_BOUNDS_<DEALER>="min,max" environment variables
+
+    Returns:
+        dict: dealer -> (min, max)
+    """
+    bounds = dict(INTERVAL_BOUNDS)
+    for dealer in INTERVAL_BOUNDS:
+        value = os.getenv(f'POLL_BOUNDS_{dealer.upper()}')
+        if not value:
+            continue
+        try:
+            low, high = (float(part) for part in value.split(","))
+        except ValueError:
+            logger.warning(f"Ignoring POLL_BOUNDS_{dealer.upper()}={value!r}, expected \"min,max\"")
+            continue
+        bounds[dealer] = (min(low, high), max(low, high))
+    return bounds
+
+
+class _SymbolSchedule:
+    __slots__ = ("interval", "next_due", "last_price", "last_polled", "volatility", "change_rate")
+
+    def __init__(self, interval, next_due):
+        self.interval = interval
+        self.next_due = next_due
+        self.last_price = None
+        self.last_polled = None
+        # EWMA of |log return| per sqrt(second), and of "price changed" (0/1)
+        self.volatility = None
+        self.change_rate = 1.0
+
+
+class AdaptiveScheduler:
+    """Decide which symbols are due for polling and when"""
+
+    def __init__(self, symbols, base_interval=None, target_move=0.001, alpha=0.2,
+                 quiet_change_rate=0.2, growth=1.5, shrink=4.0, bounds=None):
+        """
+        Args:
+            symbols (dict): {dealer: [symbols]} to schedule
+            base_interval (float, optional): Starting interval; defaults to SCRAPE_INTERVAL
+            target_move (float): Relative price move wanted between two polls
+            alpha (float): EWMA weight of each new observation
+            quiet_change_rate (float): Below this fraction of polls seeing a change,
+                                       the symbol is treated as quiet and backs off
+            growth (float): Largest factor an interval may grow by per poll
+            shrink (float): Largest factor an interval may shrink by per poll
+            bounds (dict, optional): dealer -> (min, max); defaults to bounds_from_env()
+        """
+        self.base_interval = float(os.getenv('SCRAPE_INTERVAL', '3600')) if base_interval is None else base_interval
+        self.target_move = target_move
+        self.alpha = alpha
+        self.quiet_change_rate = quiet_change_rate
+        self.growth = growth
+        self.shrink = shrink
+        self.bounds = bounds_from_env() if bounds is None else dict(bounds)
+        self._lock = threading.Lock()
+
+        now = time.time()
+        self._schedules = {}
+        for dealer, dealer_symbols in symbols.items():
+            for symbol in dealer_symbols:
+                interval = self._clamp(dealer, self.base_interval)
+                # Everything is due straight away on start-up
+                self._schedules[(dealer, symbol)] = _SymbolSchedule(interval, now)
+
+    def due(self, now=None):
+        """
+        Symbols whose next poll is due
+
+        Returns:
+            dict: {dealer: [symbols]}
+        """
+        now = time.time() if now is None else now
+        due = {}
+        with self._lock:
+            for (dealer, symbol), schedule in self._schedules.items():
+                if schedule.next_due <= now:
+                    due.setdefault(dealer, []).append(symbol)
+        return due
+
+    def seconds_until_next(self, now=None):
+        """Seconds until the earliest next poll (0 if something is already due)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self._schedules:
+                return self.base_interval
+            return max(0.0, min(s.next_due for s in self._schedules.values()) - now)
+
+    def observe(self, dealer, symbol, price, now=None):
+        """
+        Record a poll result and reschedule the symbol
+
+        Args:
+            price (float): Price fetched, or None if the poll failed
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            schedule = self._schedules.get((dealer, symbol))
+            if schedule is None:
+                return
+
+            if price is None:
+                # Retry failures soon, without changing the learned interval
+                low, _ = self.bounds.get(dealer, (self.base_interval, self.base_interval))
+                schedule.next_due = now + min(schedule.interval, low)
+                return
+
+            if schedule.last_price is not None and schedule.last_price > 0 and price > 0:
+                elapsed = max(now - schedule.last_polled, 1e-6)
+                move = abs(math.log(price / schedule.last_price)) / math.sqrt(elapsed)
+                changed = 1.0 if price != schedule.last_price else 0.0
+                schedule.volatility = move if schedule.volatility is None else (
+                    (1 - self.alpha) * schedule.volatility + self.alpha * move)
+                schedule.change_rate = (1 - self.alpha) * schedule.change_rate + self.alpha * changed
+                interval = self._next_interval(dealer, schedule)
+                if interval != schedule.interval:
+                    logger.debug("%s %s: poll interval %.0fs -> %.0fs", dealer, symbol, schedule.interval, interval)
+                schedule.interval = interval
+
+            schedule.last_price = price
+            schedule.last_polled = now
+            schedule.next_due = now + schedule.interval
+
+    def observe_snapshot(self, snapshot, now=None):
+        """Reschedule from an aggregator snapshot; only fresh prices count as polls"""
+        for dealer, items in snapshot.items():
+            for symbol, item in items.items():
+                price = item.get("price") if item.get("status") == "fresh" else None
+                self.observe(dealer, symbol, price, now)
+
+    def intervals(self):
+        """Current interval per (dealer, symbol), in seconds"""
+        with self._lock:
+            return {key: schedule.interval for key, schedule in self._schedules.items()}
+
+    def _next_interval(self, dealer, schedule):
+        current = schedule.interval
+        if schedule.change_rate < self.quiet_change_rate or not schedule.volatility:
+            # Rarely changes: back off
+            wanted = current * self.growth
+        else:
+            # Interval at which the expected move is about target_move
+            wanted = (self.target_move / schedule.volatility) ** 2
+
+        wanted = min(wanted, current * self.growth)
+        wanted = max(wanted, current / self.shrink)
+        return self._clamp(dealer, wanted)
+
+    def _clamp(self, dealer, interval):
+        low, high = self.bounds.get(dealer, (interval, interval))
+        return min(max(interval, low), high)
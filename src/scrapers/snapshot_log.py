@@ -0,0 +1,297 @@
+"""
+Append-only JSON Lines snapshot log with group-committed fsync
+
+Replaces rewriting a whole JSON file on every run. Each snapshot is one line
+appended to the current segment; segments roll over at a size limit, so
+history is kept and nothing is ever rewritten. A crash can at worst leave
+a torn final line, which readers skip.
+
+Reopening a log continues its newest segment (after trimming any torn final
+line), so short-lived processes appending one snapshot each share a segment
+and segments only roll over on size.
+
+Writes are made durable in groups: fsync runs once every fsync_every
+appends or fsync_interval seconds, whichever comes first.
+
+Every segment has a sparse index (<segment>.idx, one "timestamp offset" line
+every index_every bytes) so readers can seek to a timestamp without scanning
+the whole log.
+"""
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger('price_scraper')
+
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx"
+
+
+class SnapshotLog:
+    """Rotated, append-only JSONL log of price snapshots"""
+
+    def __init__(self, directory, name="snapshots", max_segment_bytes=32 * 1024 * 1024,
+                 fsync_every=100, fsync_interval=1.0, index_every=64 * 1024):
+        """
+        Args:
+            directory (str): Where segments are written
+            name (str): Segment file name prefix
+            max_segment_bytes (int): Start a new segment beyond this size
+            fsync_every (int): fsync after this many appends
+            fsync_interval (float): ...or after this many seconds (0 disables the timer)
+            index_every (int): Bytes between sparse index entries
+        """
+        self.directory = directory
+        self.name = name
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.index_every = index_every
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._index_file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._last_indexed = None
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+
+        if fsync_interval:
+            self._timer = threading.Thread(target=self._sync_periodically, name="snapshot-fsync", daemon=True)
+            self._timer.start()
+
+    def append(self, record):
+        """
+        Append one snapshot
+
+        Args:
+            record (dict): JSON-serialisable snapshot. A "ts" (epoch seconds)
+                           is added if missing and used for seeking.
+        """
+        record = dict(record)
+        record.setdefault("ts", time.time())
+        line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+
+        with self._lock:
+            if self._file is None:
+                self._reopen_latest()
+            if self._file is None or self._file.tell() >= self.max_segment_bytes:
+                self._roll(record["ts"])
+
+            offset = self._file.tell()
+            # One write per record so a crash can only tear the last line
+            self._file.write(line)
+
+            if self._last_indexed is None or offset - self._last_indexed >= self.index_every:
+                self._index_file.write(f"{record['ts']} {offset}\n".encode("utf-8"))
+                self._last_indexed = offset
+
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every:
+                self._sync()
+
+    def flush(self):
+        """Force pending appends to disk"""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._sync()
+            if self._file is not None:
+                self._file.close()
+                self._index_file.close()
+                self._file = None
+                self._index_file = None
+
+    def segments(self):
+        """Segment paths, oldest first"""
+        return list_segments(self.directory, self.name)
+
+    def read_from(self, since=None):
+        """
+        Yield snapshots with ts >= since, oldest first
+
+        Uses segment names and the sparse index to skip straight to the
+        right place instead of scanning the whole log.
+        """
+        segments = self.segments()
+        if since is not None and segments:
+            starts = [_segment_start(path) for path in segments]
+            first = max(bisect.bisect_right(starts, since) - 1, 0)
+            segments = segments[first:]
+
+        for position, path in enumerate(segments):
+            offset = _index_offset(path, since) if since is not None and position == 0 else 0
+            for record in _read_segment(path, offset):
+                if since is None or record.get("ts", 0) >= since:
+                    yield record
+
+    def tail(self, count=1):
+        """Return the last count snapshots, oldest first"""
+        if count <= 0:
+            return []
+        records = []
+        for path in reversed(self.segments()):
+            records = _tail_segment(path, count - len(records)) + records
+            if len(records) >= count:
+                break
+        return records
+
+    def _reopen_latest(self):
+        """Continue appending to the newest segment if it has room"""
+        segments = self.segments()
+        if not segments or os.path.getsize(segments[-1]) >= self.max_segment_bytes:
+            return
+
+        path = segments[-1]
+        size = _trim_torn_tail(path)
+        last_indexed = _trim_index(path + INDEX_SUFFIX, size)
+        self._file = open(path, "ab")
+        self._index_file = open(path + INDEX_SUFFIX, "ab")
+        self._last_indexed = last_indexed
+        logger.info(f"Appending snapshots to {path}")
+
+    def _roll(self, first_ts):
+        """Close the current segment and start a new one"""
+        self._sync()
+        if self._file is not None:
+            self._file.close()
+            self._index_file.close()
+
+        base = os.path.join(self.directory, f"{self.name}-{int(first_ts * 1000)}")
+        self._file = open(base + SEGMENT_SUFFIX, "ab")
+        self._index_file = open(base + SEGMENT_SUFFIX + INDEX_SUFFIX, "ab")
+        self._last_indexed = None
+        logger.info(f"Writing snapshots to {base + SEGMENT_SUFFIX}")
+
+    def _sync(self):
+        """Group commit: flush and fsync everything appended so far"""
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._index_file.flush()
+            os.fsync(self._index_file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _sync_periodically(self):
+        while not self._closed:
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                if self._unsynced and time.monotonic() - self._last_sync >= self.fsync_interval:
+                    self._sync()
+
+
+def list_segments(directory, name="snapshots"):
+    """Segment paths for a log name, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    prefix = f"{name}-"
+    paths = [
+        os.path.join(directory, entry) for entry in os.listdir(directory)
+        if entry.startswith(prefix) and entry.endswith(SEGMENT_SUFFIX)
+    ]
+    return sorted(paths, key=_segment_start)
+
+
+def _segment_start(path):
+    """Timestamp of the first record, taken from the segment name"""
+    stem = os.path.basename(path)[:-len(SEGMENT_SUFFIX)]
+    return int(stem.rsplit("-", 1)[1]) / 1000
+
+
+def _index_offset(path, since):
+    """Byte offset of the last indexed record with ts < since"""
+    offset = 0
+    try:
+        with open(path + INDEX_SUFFIX, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 2:
+                    continue
+                if float(parts[0]) >= since:
+                    break
+                offset = int(parts[1])
+    except FileNotFoundError:
+        pass
+    return offset
+
+
+def _trim_torn_tail(path, block_size=64 * 1024):
+    """Truncate a segment after its last complete line; returns the new size"""
+    with open(path, "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        position = size
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            newline = f.read(read_size).rfind(b"\n")
+            if newline != -1:
+                end = position + newline + 1
+                break
+        else:
+            end = 0
+
+        if end != size:
+            logger.warning(f"Trimming {size - end} bytes of torn data from {path}")
+            f.truncate(end)
+        return end
+
+
+def _trim_index(index_path, segment_size):
+    """Drop index entries past the end of a trimmed segment; returns the last indexed offset"""
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return None
+
+    kept = []
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 2 and line.endswith("\n") and int(parts[1]) < segment_size:
+            kept.append(line)
+    if len(kept) != len(lines):
+        with open(index_path, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+    return int(kept[-1].split()[1]) if kept else None
+
+
+def _read_segment(path, offset=0):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            try:
+                yield json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # Torn final line after a crash
+                logger.warning(f"Skipping unreadable line in {path}")
+
+
+def _tail_segment(path, count, block_size=64 * 1024):
+    """Last count records of a segment, reading backwards from the end"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+
+    records = []
+    for line in data.splitlines()[-(count + 1):]:
+        try:
+            records.append(json.loads(line))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+    return records[-count:]
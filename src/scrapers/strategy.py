@@ -0,0 +1,104 @@
+"""
+Adaptive ordering of price extraction strategies
+
+Scrapers often have several ways of finding a price on a page (regex over the
+raw HTML, a CSS class lookup, a table walk). Trying them in a fixed order
+means every page pays for each failing strategy before the one that works.
+AdaptiveStrategies remembers which strategy last succeeded for each key
+(e.g. a metal symbol) and tries it first, so after a site redesign the steady
+state goes back to a single traversal per page.
+"""
+import time
+import logging
+import threading
+
+logger = logging.getLogger('price_scraper')
+
+
+class AdaptiveStrategies:
+    """Run named extraction strategies, most recently successful first"""
+
+    def __init__(self, source, strategies):
+        """
+        Args:
+            source (str): Dealer name, used in logs and stats
+            strategies (list): [(name, function), ...] in default order.
+                               Each function returns a price or None.
+        """
+        self.source = source
+        self.strategies = dict(strategies)
+        self.default_order = [name for name, _ in strategies]
+        self._order = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, *args):
+        """
+        Try each strategy for key until one returns a value
+
+        Args:
+            key (str): What is being extracted, e.g. "XAU"
+            *args: Passed to every strategy function
+
+        Returns:
+            The first non-None result, or None if every strategy failed
+        """
+        with self._lock:
+            order = list(self._order.get(key, self.default_order))
+
+        for name in order:
+            start = time.perf_counter()
+            try:
+                result = self.strategies[name](*args)
+            except Exception as e:
+                logger.debug("%s strategy '%s' raised for %s: %s", self.source, name, key, e)
+                result = None
+            self._record(key, name, result is not None, time.perf_counter() - start)
+
+            if result is not None:
+                if name != order[0]:
+                    logger.warning(f"{self.source} strategy '{order[0]}' failed for {key}, '{name}' will be tried first from now on")
+                    with self._lock:
+                        self._order[key] = [name] + [other for other in order if other != name]
+                return result
+
+        return None
+
+    def preferred(self, key):
+        """Name of the strategy that will be tried first for key"""
+        with self._lock:
+            return self._order.get(key, self.default_order)[0]
+
+    def stats(self):
+        """
+        Per-key, per-strategy attempt counts, successes and mean latency
+
+        Returns:
+            dict: {key: {strategy: {"attempts", "successes", "mean_ms"}}}
+        """
+        with self._lock:
+            return {
+                key: {
+                    name: {
+                        "attempts": s["attempts"],
+                        "successes": s["successes"],
+                        "mean_ms": 1000 * s["total_seconds"] / s["attempts"] if s["attempts"] else 0.0,
+                    }
+                    for name, s in per_strategy.items()
+                }
+                for key, per_strategy in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._order.clear()
+            self._stats.clear()
+
+    def _record(self, key, name, success, seconds):
+        with self._lock:
+            s = self._stats.setdefault(key, {}).setdefault(
+                name, {"attempts": 0, "successes": 0, "total_seconds": 0.0}
+            )
+            s["attempts"] += 1
+            s["successes"] += int(success)
+            s["total_seconds"] += seconds
@@ -0,0 +1,328 @@
+"""
+Bulk backfill importer for historical price data
+
+Loads CSV exports, JSON Lines files and spot_prices.json-style snapshots into
+the price history collection. Files are read in chunks so memory stays
+bounded however large the export is, and each chunk is validated and
+normalised with vectorised pandas operations before one bulk insert.
+
+Normalisation:
+    - column names are mapped onto timestamp, symbol, price, currency, unit, source
+    - symbols and product names are mapped onto ATKINSONS_SPOT / CHARD_COINS keys
+    - spot prices quoted per gram or kilogram are converted to per troy ounce
+    - prices are converted to GBP with the given exchange rates
+    - timestamps are parsed to UTC with one date order for the whole column
+      (day-first by default, as in UK dealer exports, or an explicit
+      --date-format)
+Rows that fail any check are counted and dropped. JSON arrays are streamed
+record by record, so .json exports are bounded too.
+
+Usage (from src/):
+    python -m utils.backfill exports/sovereigns.csv spot_prices.json --fx USD=0.79
+"""
+import os
+import json
+import time
+import itertools
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from scrapers.coins import CHARD_COINS
+from scrapers.metals_spot import ATKINSONS_SPOT
+
+logger = logging.getLogger('price_scraper')
+
+DEFAULT_CHUNK_SIZE = 200000
+TROY_OUNCE_GRAMS = 31.1034768
+
+# Alternative column names found in exports -> our field names
+COLUMN_ALIASES = {
+    "date": "timestamp", "datetime": "timestamp", "time": "timestamp", "ts": "timestamp",
+    "coin": "symbol", "coin_id": "symbol", "product": "symbol", "metal": "symbol", "ticker": "symbol",
+    "close": "price", "value": "price", "price_gbp": "price",
+    "ccy": "currency",
+    "units": "unit",
+    "dealer": "source",
+}
+
+# Multiply a price quoted per unit by this factor to get the price per troy
+# ounce (spot) or per coin (coins are quoted "each")
+UNIT_FACTORS = {
+    "toz": 1.0, "oz": 1.0, "ozt": 1.0, "each": 1.0, "coin": 1.0,
+    "g": TROY_OUNCE_GRAMS, "gram": TROY_OUNCE_GRAMS, "grams": TROY_OUNCE_GRAMS,
+    "kg": TROY_OUNCE_GRAMS / 1000, "kilo": TROY_OUNCE_GRAMS / 1000,
+}
+
+
+def _build_symbol_maps():
+    """Lower-cased symbol / name / alias -> (config key, source)"""
+    symbols = {}
+    for coin_id, (_, coin_name, _) in CHARD_COINS.items():
+        symbols[coin_id.lower()] = (coin_id, "chards")
+        symbols[coin_name.lower()] = (coin_id, "chards")
+    for metal_symbol, (_, metal_name, _) in ATKINSONS_SPOT.items():
+        for alias in (metal_symbol, metal_name, f"{metal_symbol}_gram", f"{metal_name}_spot"):
+            symbols[alias.lower()] = (metal_symbol, "atkinsons")
+    return (
+        {alias: key for alias, (key, _) in symbols.items()},
+        {key: source for key, source in symbols.values()},
+    )
+
+
+SYMBOL_ALIASES, SYMBOL_SOURCES = _build_symbol_maps()
+
+
+def normalise_chunk(df, source=None, currency="GBP", fx_rates=None, date_format=None, dayfirst=True):
+    """
+    Validate and normalise one chunk of raw rows
+
+    Args:
+        df (DataFrame): Raw rows with at least timestamp, symbol and price columns
+        source (str, optional): Force this source instead of inferring it from the symbol
+        currency (str): Currency assumed for rows without a currency column
+        fx_rates (dict, optional): Currency -> GBP rate, e.g. {"USD": 0.79}
+        date_format (str, optional): strftime format of every timestamp, e.g. "%d/%m/%Y"
+        dayfirst (bool): Read ambiguous dates such as 01/02/2024 as day first
+                         (ignored when date_format is given)
+
+    Returns:
+        tuple: (DataFrame of source, symbol, price, currency, timestamp rows, rejected count)
+    """
+    df = df.rename(columns=lambda c: COLUMN_ALIASES.get(str(c).strip().lower(), str(c).strip().lower()))
+    missing = {"timestamp", "symbol", "price"} - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(sorted(missing))}")
+
+    rates = {"GBP": 1.0}
+    rates.update({ccy.upper(): rate for ccy, rate in (fx_rates or {}).items()})
+
+    raw_symbol = df["symbol"].astype("string").str.strip().str.lower()
+    symbol = raw_symbol.map(SYMBOL_ALIASES)
+
+    # Per-gram spot symbols (e.g. XAU_GRAM) imply the unit when none is given
+    if "unit" in df.columns:
+        unit = df["unit"].astype("string").str.strip().str.lower()
+    else:
+        unit = pd.Series(pd.NA, index=df.index, dtype="string")
+    implied_unit = pd.Series(np.where(raw_symbol.str.endswith("_gram").fillna(False), "g", "toz"), index=df.index)
+    unit = unit.fillna(implied_unit)
+
+    if "currency" in df.columns:
+        ccy = df["currency"].astype("string").str.strip().str.upper().fillna(currency.upper())
+    else:
+        ccy = pd.Series(currency.upper(), index=df.index)
+
+    price = df["price"]
+    if not pd.api.types.is_numeric_dtype(price):
+        price = price.astype("string").str.replace(r"[£$€,\s]", "", regex=True)
+    price = pd.to_numeric(price, errors="coerce").astype("float64")
+    price = price * unit.map(UNIT_FACTORS).astype("float64") * ccy.map(rates).astype("float64")
+
+    timestamp = _parse_timestamps(df["timestamp"], date_format=date_format, dayfirst=dayfirst)
+
+    if source:
+        sources = pd.Series(source, index=df.index)
+    elif "source" in df.columns:
+        sources = df["source"].astype("string").str.strip().str.lower().fillna(symbol.map(SYMBOL_SOURCES))
+    else:
+        sources = symbol.map(SYMBOL_SOURCES)
+
+    valid = (
+        timestamp.notna().to_numpy()
+        & symbol.notna().to_numpy()
+        & np.isfinite(price.to_numpy())
+        & (price.to_numpy() > 0)
+    )
+
+    out = pd.DataFrame({
+        "source": sources.astype(object),
+        "symbol": symbol.astype(object),
+        "price": price.round(4),
+        "currency": "GBP",
+        # Naive UTC datetimes, as pymongo stores them
+        "timestamp": timestamp.dt.tz_localize(None),
+    })[valid]
+    return out, int(len(df) - valid.sum())
+
+
+def read_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield raw DataFrame chunks from a CSV, JSON Lines or JSON file
+
+    Snapshot records ({"timestamp", "prices": {symbol: price}}) are
+    expanded into one row per symbol.
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension in (".csv", ".txt"):
+        chunks = pd.read_csv(path, chunksize=chunk_size)
+    elif extension in (".jsonl", ".ndjson"):
+        chunks = pd.read_json(path, lines=True, chunksize=chunk_size, convert_dates=False, dtype=False)
+    elif extension == ".json":
+        records = _iter_json_records(path)
+        chunks = (
+            pd.DataFrame(batch)
+            for batch in iter(lambda: list(itertools.islice(records, chunk_size)), [])
+        )
+    else:
+        raise ValueError(f"Unsupported file type: {path}")
+
+    for chunk in chunks:
+        if "prices" in chunk.columns:
+            chunk = _snapshots_to_rows(chunk)
+        yield chunk
+
+
+def import_file(path, chunk_size=DEFAULT_CHUNK_SIZE, source=None, currency="GBP",
+                fx_rates=None, db=None, dry_run=False, writer=None, date_format=None, dayfirst=True):
+    """
+    Stream a history file into the price history collection
+
+    Args:
+        path (str): CSV, JSON Lines or JSON file
+        chunk_size (int): Rows per chunk; bounds memory use
+        source, currency, fx_rates, date_format, dayfirst: See normalise_chunk
+        db (Database, optional): Database to write to. Defaults to get_database().
+        dry_run (bool): Validate and count rows without writing
+        writer (callable, optional): writer(records, db) used instead of insert_price_history
+
+    Returns:
+        dict: rows_read, rows_imported, rows_rejected and seconds
+    """
+    if writer is None and not dry_run:
+        # Imported here so dry runs work without a MongoDB driver installed
+        from utils.database import get_database, insert_price_history
+        writer = lambda records, db: insert_price_history(records, db=db)
+        db = get_database() if db is None else db
+
+    stats = {"rows_read": 0, "rows_imported": 0, "rows_rejected": 0, "seconds": 0.0}
+    start = time.perf_counter()
+
+    for chunk in read_chunks(path, chunk_size):
+        rows, rejected = normalise_chunk(chunk, source=source, currency=currency, fx_rates=fx_rates,
+                                         date_format=date_format, dayfirst=dayfirst)
+        stats["rows_read"] += len(chunk)
+        stats["rows_rejected"] += rejected
+
+        if not dry_run and len(rows):
+            writer(rows.to_dict("records"), db)
+        stats["rows_imported"] += len(rows)
+
+        logger.info(f"{path}: {stats['rows_read']} rows read, {stats['rows_imported']} imported, {stats['rows_rejected']} rejected")
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def _parse_timestamps(values, date_format=None, dayfirst=True):
+    """
+    Parse timestamps to UTC
+
+    With date_format every value must match it. Otherwise ISO 8601 values are
+    parsed as such and every other value with the given day order, so
+    01/02/2024 and 13/02/2024 are never read differently within one file.
+    """
+    if date_format:
+        return pd.to_datetime(values, utc=True, errors="coerce", format=date_format)
+
+    # ISO 8601 first: strict, fast, and unaffected by the day order
+    timestamp = pd.to_datetime(values, utc=True, errors="coerce", format="ISO8601")
+    # Then one format inferred from the remaining values with the given day
+    # order, and finally per-element parsing, which is slow and so only sees
+    # what is left
+    for options in ({"dayfirst": dayfirst}, {"format": "mixed", "dayfirst": dayfirst}):
+        unparsed = timestamp.isna() & values.notna()
+        if not unparsed.any():
+            break
+        timestamp[unparsed] = pd.to_datetime(values[unparsed], utc=True, errors="coerce", **options)
+    return timestamp
+
+
+def _iter_json_records(path, block_size=1 << 20):
+    """
+    Yield the records of a JSON array file one at a time, reading it in blocks
+
+    A file holding a single object (one snapshot) yields that object.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(block_size)
+        pos = len(buffer) - len(buffer.lstrip())
+        if buffer[pos:pos + 1] != "[":
+            yield json.loads(buffer + f.read())
+            return
+        pos += 1
+
+        while True:
+            # Skip the separators between records, reading more as needed
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                more = f.read(block_size)
+                if not more:
+                    raise ValueError(f"Unterminated JSON array in {path}")
+                buffer, pos = more, 0
+                continue
+            if buffer[pos] == "]":
+                return
+
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The record runs past the end of the buffer
+                more = f.read(block_size)
+                if not more:
+                    raise
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield record
+            pos = end
+
+
+def _snapshots_to_rows(df):
+    """Expand {"timestamp", "prices": {symbol: price}} records to long rows"""
+    df = df[df["prices"].map(lambda prices: isinstance(prices, dict) and len(prices) > 0)]
+    if df.empty:
+        return pd.DataFrame(columns=["timestamp", "symbol", "price"])
+
+    wide = pd.DataFrame(df["prices"].tolist(), index=df.index)
+    wide.columns.name = "symbol"
+    long = wide.stack().rename("price").reset_index(level="symbol")
+    long = long[long["price"].notna()]
+    long["timestamp"] = df["timestamp"].reindex(long.index).to_numpy()
+    return long.reset_index(drop=True)
+
+
+def _parse_fx(values):
+    rates = {}
+    for value in values or []:
+        ccy, _, rate = value.partition("=")
+        rates[ccy.strip().upper()] = float(rate)
+    return rates
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Backfill historical prices into MongoDB")
+    parser.add_argument("paths", nargs="+", help="CSV, JSON Lines or JSON files")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--source", help="Force the source for every row, e.g. chards")
+    parser.add_argument("--currency", default="GBP", help="Currency of rows without a currency column")
+    parser.add_argument("--fx", action="append", help="Exchange rate to GBP, e.g. USD=0.79")
+    parser.add_argument("--date-format", help="Format of every timestamp, e.g. %%d/%%m/%%Y")
+    parser.add_argument("--monthfirst", action="store_true",
+                        help="Read ambiguous dates as month first (default is day first)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only, do not write")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        stats = import_file(path, chunk_size=args.chunk_size, source=args.source, currency=args.currency,
+                            fx_rates=_parse_fx(args.fx), dry_run=args.dry_run,
+                            date_format=args.date_format, dayfirst=not args.monthfirst)
+        print(f"{path}: {stats['rows_imported']} imported, {stats['rows_rejected']} rejected "
+              f"of {stats['rows_read']} in {stats['seconds']:.1f}s")
@@ -0,0 +1,239 @@
+"""Database connection utilities
+
+Prices are stored in two collections:
+    price_history - every observation, indexed for time-range queries
+    latest_prices - one document per (source, symbol), upserted in bulk each
+                    cycle, so "latest price" is a point lookup by _id
+
+Every function takes an optional db argument, so a local stand-in such as
+mongomock.MongoClient().db can be passed instead of a live server. The
+indexes are created on the first write to each database, and one MongoClient
+(with its connection pool) is shared by every get_database() call.
+"""
+import os
+import time
+import threading
+from datetime import datetime, timezone
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Collection holding every scraped or imported price observation
+PRICE_HISTORY_COLLECTION = 'price_history'
+
+# Collection holding only the most recent price per (source, symbol)
+LATEST_PRICES_COLLECTION = 'latest_prices'
+
+# Seconds a latest-price read is served from the in-process cache
+LATEST_CACHE_TTL = float(os.getenv('LATEST_CACHE_TTL', '5'))
+
+_latest_cache = {}   # (database key, kind, ...) -> (expires_at, value)
+_cache_lock = threading.Lock()
+
+_client = {"uri": None, "client": None}
+_client_lock = threading.Lock()
+
+# (client id, database name) of databases whose indexes have been ensured
+_indexed = set()
+
+
+def get_database():
+    """Returns a connection to the MongoDB database"""
+    connection_string = os.getenv('MONGODB_URI')
+    if not connection_string:
+        raise EnvironmentError("MONGODB_URI environment variable not set")
+
+    # MongoClient is thread-safe and pools connections, so create it once
+    with _client_lock:
+        if _client["client"] is None or _client["uri"] != connection_string:
+            if _client["client"] is not None:
+                _client["client"].close()
+            _client["client"] = MongoClient(connection_string)
+            _client["uri"] = connection_string
+        client = _client["client"]
+
+    db_name = os.getenv('MONGODB_DATABASE', 'finance_data')
+    return client[db_name]
+
+
+def ensure_indexes(db=None):
+    """Create the indexes the read paths rely on (safe to call repeatedly)"""
+    db = get_database() if db is None else db
+    history = db[PRICE_HISTORY_COLLECTION]
+    # Time-range queries per symbol, optionally narrowed to one source
+    history.create_index([("symbol", ASCENDING), ("timestamp", DESCENDING)])
+    history.create_index([("source", ASCENDING), ("symbol", ASCENDING), ("timestamp", DESCENDING)])
+    db[LATEST_PRICES_COLLECTION].create_index([("symbol", ASCENDING)])
+    _indexed.add(_database_key(db))
+
+
+def insert_price_history(records, db=None, batch_size=10000):
+    """
+    Bulk insert price observations into the history collection
+
+    Args:
+        records (list): Documents with source, symbol, price, currency and timestamp
+        db (Database, optional): Database to write to. Defaults to get_database().
+        batch_size (int): Documents per insert_many call
+
+    Returns:
+        int: Number of documents inserted
+    """
+    db = get_database() if db is None else db
+    _ensure_indexes_once(db)
+    collection = db[PRICE_HISTORY_COLLECTION]
+
+    inserted = 0
+    for start in range(0, len(records), batch_size):
+        # Unordered inserts let the server apply a batch in parallel
+        result = collection.insert_many(records[start:start + batch_size], ordered=False)
+        inserted += len(result.inserted_ids)
+    return inserted
+
+
+def store_snapshot(snapshot, db=None):
+    """
+    Store the fresh prices of an aggregator snapshot
+
+    Appends them to price_history and upserts latest_prices in one bulk
+    write. Stale and failed items are skipped, as they carry no new price.
+
+    Args:
+        snapshot (dict): {source: {symbol: {"price", "name", "status", "fetched_at", ...}}}
+        db (Database, optional): Defaults to get_database()
+
+    Returns:
+        int: Number of prices stored
+    """
+    db = get_database() if db is None else db
+
+    records = []
+    for source, items in snapshot.items():
+        for symbol, item in items.items():
+            if item.get("status") != "fresh" or not item.get("price"):
+                continue
+            fetched_at = item.get("fetched_at") or time.time()
+            records.append({
+                "source": source,
+                "symbol": symbol,
+                "name": item.get("name"),
+                "price": item["price"],
+                "currency": "GBP",
+                # Naive UTC datetimes, as pymongo stores them
+                "timestamp": datetime.fromtimestamp(fetched_at, timezone.utc).replace(tzinfo=None),
+            })
+    if not records:
+        return 0
+
+    # insert_many adds an _id to each document, so upsert from copies
+    latest = [
+        UpdateOne({"_id": _latest_id(r["source"], r["symbol"])}, {"$set": dict(r)}, upsert=True)
+        for r in records
+    ]
+    insert_price_history(records, db=db)
+    db[LATEST_PRICES_COLLECTION].bulk_write(latest, ordered=False)
+
+    # Write-through: drop cached reads that this cycle has superseded
+    database_key = _database_key(db)
+    with _cache_lock:
+        for r in records:
+            _latest_cache.pop((database_key, "one", r["source"], r["symbol"]), None)
+        for key in [key for key in _latest_cache if key[:2] == (database_key, "all")]:
+            del _latest_cache[key]
+
+    return len(records)
+
+
+def get_latest_price(source, symbol, db=None):
+    """
+    Latest stored price for one (source, symbol), as a point lookup
+
+    Returns:
+        dict: The latest_prices document, or None
+    """
+    database = get_database() if db is None else db
+
+    def load():
+        return database[LATEST_PRICES_COLLECTION].find_one({"_id": _latest_id(source, symbol)})
+
+    return _cached((_database_key(database), "one", source, symbol), load)
+
+
+def get_latest_prices(source=None, db=None):
+    """
+    Latest stored price of every symbol, optionally for one source
+
+    Returns:
+        list: latest_prices documents
+    """
+    database = get_database() if db is None else db
+
+    def load():
+        query = {"source": source} if source else {}
+        return list(database[LATEST_PRICES_COLLECTION].find(query))
+
+    return _cached((_database_key(database), "all", source), load)
+
+
+def get_price_history(symbol, start=None, end=None, source=None, db=None, limit=0):
+    """
+    Price observations for a symbol in a time range, newest first
+
+    Args:
+        symbol (str): Scraper key, e.g. "sovereign" or "XAU"
+        start, end (datetime, optional): Inclusive UTC bounds
+        source (str, optional): Only this source
+        limit (int): Maximum documents (0 for no limit)
+
+    Returns:
+        list: price_history documents
+    """
+    db = get_database() if db is None else db
+    query = {"symbol": symbol}
+    if source:
+        query["source"] = source
+    if start or end:
+        query["timestamp"] = {}
+        if start:
+            query["timestamp"]["$gte"] = start
+        if end:
+            query["timestamp"]["$lte"] = end
+    cursor = db[PRICE_HISTORY_COLLECTION].find(query).sort("timestamp", DESCENDING)
+    if limit:
+        cursor = cursor.limit(limit)
+    return list(cursor)
+
+
+def clear_cache():
+    """Drop every cached latest-price read"""
+    with _cache_lock:
+        _latest_cache.clear()
+
+
+def _database_key(db):
+    return id(db.client), db.name
+
+
+def _ensure_indexes_once(db):
+    if _database_key(db) not in _indexed:
+        ensure_indexes(db)
+
+
+def _latest_id(source, symbol):
+    return f"{source}:{symbol}"
+
+
+def _cached(key, load):
+    """Serve key from the TTL cache, loading it on a miss or expiry"""
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _latest_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    value = load()
+    with _cache_lock:
+        _latest_cache[key] = (now + LATEST_CACHE_TTL, value)
+    return value
@@ -0,0 +1,192 @@
+"""
+Offline load test for the scrapers against local mock dealer servers
+
+Starts one MockDealerServer per dealer, points the fetch layer at them, and
+calls chards_prod.get_all_prices and atkinson_spot_prod.get_all_prices
+concurrently under each fetch scenario:
+    live        - plain fetches (also recorded for the replay scenario)
+    conditional - ETag revalidation, unchanged pages come back as 304
+    replay      - served from the recording, no network
+For each it reports throughput, p50/p95/p99/max latency and error count.
+
+--max-p95 turns the run into a performance gate: the exit code is 1 if any
+scenario's p95 latency exceeds it.
+
+Usage (from src/):
+    python -m utils.load_test --calls 200 --concurrency 8 --latency 0.02 --max-p95 0.5
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from scrapers import fetch, chards_prod, atkinson_spot_prod
+from scrapers.result_cache import set_result_cache_enabled, result_cache_enabled
+from scrapers.coins import CHARD_COINS
+from scrapers.metals_spot import ATKINSONS_SPOT
+from utils.mock_dealer import MockDealerServer, default_pages
+
+logger = logging.getLogger('price_scraper')
+
+FETCH_SCENARIOS = ("live", "conditional", "replay")
+
+# Scraper entry points under test: name -> (function, number of prices expected)
+TARGETS = {
+    "chards": (chards_prod.get_all_prices, len(CHARD_COINS)),
+    "atkinsons": (atkinson_spot_prod.get_all_prices, len(ATKINSONS_SPOT)),
+}
+
+
+def run_load(function, expected, calls, concurrency):
+    """
+    Call function concurrently and time each call
+
+    Returns:
+        dict: calls, errors, seconds, throughput and latency percentiles
+    """
+    def timed_call(_):
+        start = time.perf_counter()
+        try:
+            ok = len(function()) >= expected
+        except Exception as e:
+            logger.error(f"Load test call failed: {e}")
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(timed_call, range(calls)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in outcomes)
+    return {
+        "calls": calls,
+        "errors": sum(1 for _, ok in outcomes if not ok),
+        "seconds": elapsed,
+        "throughput": calls / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1] if latencies else 0.0,
+    }
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(q / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_load_test(calls=100, concurrency=4, scenarios=FETCH_SCENARIOS, latency=0.0, jitter=0.0,
+                  error_rate=0.0, rate_limit=None, use_rate_limiter=False):
+    """
+    Run every scenario against fresh mock servers
+
+    Args:
+        calls (int): get_all_prices calls per scraper per scenario
+        concurrency (int): Concurrent callers
+        scenarios (tuple): Subset of FETCH_SCENARIOS, run in that order
+        latency, jitter, error_rate, rate_limit: Mock server behaviour
+        use_rate_limiter (bool): Keep the adaptive client-side rate limiter on
+
+    Returns:
+        list: [{"scenario", "target", ...run_load stats}, ...]
+    """
+    servers = {
+        dealer: MockDealerServer(default_pages(dealer), latency=latency, jitter=jitter,
+                                 error_rate=error_rate, rate_limit=rate_limit).start()
+        for dealer in ("chards", "atkinsons")
+    }
+    fetch.set_host_overrides({
+        "www.chards.co.uk": servers["chards"].base_url,
+        "www.atkinsonsbullion.com": servers["atkinsons"].base_url,
+    })
+
+    saved_rate_limit = os.environ.get('RATE_LIMIT_ENABLED')
+    saved_table_ttl = chards_prod.TABLE_CACHE_TTL
+    saved_result_cache = result_cache_enabled()
+    os.environ['RATE_LIMIT_ENABLED'] = 'true' if use_rate_limiter else 'false'
+    # Measure a full fetch and parse on every call
+    chards_prod.TABLE_CACHE_TTL = 0
+    set_result_cache_enabled(False)
+    capture_dir = tempfile.mkdtemp(prefix="load_test_")
+
+    results = []
+    try:
+        for scenario in scenarios:
+            if scenario == "live":
+                fetch.set_fetch_mode("record", capture_dir)
+                fetch.set_conditional_requests(False)
+            elif scenario == "conditional":
+                fetch.set_fetch_mode("live")
+                fetch.set_conditional_requests(True)
+            elif scenario == "replay":
+                fetch.set_fetch_mode("replay", capture_dir)
+                fetch.set_conditional_requests(False)
+            else:
+                raise ValueError(f"Unknown scenario: {scenario}")
+
+            for target, (function, expected) in TARGETS.items():
+                stats = run_load(function, expected, calls, concurrency)
+                stats.update(scenario=scenario, target=target)
+                results.append(stats)
+    finally:
+        fetch.set_fetch_mode("live")
+        fetch.set_conditional_requests(False)
+        fetch.set_host_overrides(None)
+        chards_prod.TABLE_CACHE_TTL = saved_table_ttl
+        set_result_cache_enabled(saved_result_cache)
+        if saved_rate_limit is None:
+            os.environ.pop('RATE_LIMIT_ENABLED', None)
+        else:
+            os.environ['RATE_LIMIT_ENABLED'] = saved_rate_limit
+        for server in servers.values():
+            server.stop()
+        # set_fetch_mode("live") has closed the capture writer
+        shutil.rmtree(capture_dir, ignore_errors=True)
+
+    return results
+
+
+def format_results(results):
+    lines = [f"{'scenario':<12} {'target':<10} {'calls':>6} {'errors':>6} {'req/s':>8} "
+             f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+    for r in results:
+        lines.append(f"{r['scenario']:<12} {r['target']:<10} {r['calls']:>6} {r['errors']:>6} "
+                     f"{r['throughput']:>8.1f} {r['p50'] * 1000:>8.1f} {r['p95'] * 1000:>8.1f} "
+                     f"{r['p99'] * 1000:>8.1f} {r['max'] * 1000:>8.1f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Load test the scrapers against local mock dealers")
+    parser.add_argument("--calls", type=int, default=100, help="Calls per scraper per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--scenarios", default=",".join(FETCH_SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock server delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="Mock server requests per second")
+    parser.add_argument("--use-rate-limiter", action="store_true", help="Keep the client-side rate limiter on")
+    parser.add_argument("--max-p95", type=float, default=None, help="Fail if any p95 exceeds this many seconds")
+    args = parser.parse_args()
+
+    results = run_load_test(calls=args.calls, concurrency=args.concurrency,
+                            scenarios=tuple(args.scenarios.split(",")), latency=args.latency,
+                            jitter=args.jitter, error_rate=args.error_rate, rate_limit=args.rate_limit,
+                            use_rate_limiter=args.use_rate_limiter)
+    print(format_results(results))
+
+    if args.max_p95 is not None and any(r["p95"] > args.max_p95 for r in results):
+        print(f"FAILED: p95 latency above {args.max_p95}s")
+        sys.exit(1)
@@ -0,0 +1,194 @@
+"""
+Local mock dealer server for offline load testing
+
+Serves fixture pages (e.g. atkinsons_spot.html, Chards product pages) from a
+stdlib ThreadingHTTPServer with configurable behaviour:
+    - latency: fixed delay plus random jitter per request
+    - error_rate: fraction of requests answered with 503
+    - rate_limit: requests per second before answering 429 with Retry-After
+    - ETag / If-None-Match handling with 304 responses
+
+Usage (from src/):
+    python -m utils.mock_dealer --port 8001 --latency 0.05 --error-rate 0.01
+"""
+import os
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+from scrapers.coins import CHARD_COINS
+
+logger = logging.getLogger('price_scraper')
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+ATKINSONS_FIXTURE = os.path.join(REPO_ROOT, "atkinsons_spot.html")
+
+
+def chards_product_page(coin_name, price):
+    """A minimal Chards product page with a quantity-tier price table"""
+    rows = "".join(
+        f"<tr><td>{band}</td><td>£{price * factor:,.2f}</td><td>£{price * factor:,.2f}</td>"
+        f"<td>£{price * factor * 0.99:,.2f}</td></tr>"
+        for band, factor in (("1+", 1.0), ("10+", 0.99), ("25+", 0.985), ("100+", 0.98))
+    )
+    return (
+        f"<html><head><title>{coin_name}</title></head><body>"
+        f"<h1>{coin_name}</h1><h2 id=\"table-title\">Price</h2>"
+        f"<table aria-labelledby=\"table-title\"><thead><tr><th>Quantity</th><th>Price</th>"
+        f"<th>Card</th><th>Bank Transfer</th></tr></thead><tbody>{rows}</tbody></table>"
+        f"</body></html>"
+    ).encode("utf-8")
+
+
+def default_pages(dealer):
+    """Fixture pages keyed by path for "atkinsons" or "chards\""""
+    if dealer == "atkinsons":
+        with open(ATKINSONS_FIXTURE, "rb") as f:
+            return {"/": f.read()}
+    if dealer == "chards":
+        prices = {"sovereign": 620.0, "gold_britannia": 2550.0, "silver_britannia": 32.5}
+        return {
+            urlparse(url).path: chards_product_page(coin_name, prices.get(coin_id, 100.0))
+            for coin_id, (url, coin_name, _) in CHARD_COINS.items()
+        }
+    raise ValueError(f"No default fixtures for dealer: {dealer}")
+
+
+class MockDealerServer:
+    """Threaded HTTP server that plays the part of a dealer site"""
+
+    def __init__(self, pages, port=0, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None, etag=True):
+        """
+        Args:
+            pages (dict): {path: body bytes}
+            port (int): Port to listen on (0 picks a free one)
+            latency (float): Seconds added to every response
+            jitter (float): Up to this many extra random seconds
+            error_rate (float): Fraction of requests answered with 503
+            rate_limit (float, optional): Requests per second before answering 429
+            etag (bool): Send ETags and honour If-None-Match with 304
+        """
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.etag = etag
+        self.stats = {"requests": 0, "200": 0, "304": 0, "404": 0, "429": 0, "503": 0}
+
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._etags = {path: f'"{hashlib.sha1(body).hexdigest()}"' for path, body in pages.items()}
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-dealer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def set_page(self, path, body):
+        """Replace a page (its ETag changes with it)"""
+        with self._lock:
+            self.pages[path] = body
+            self._etags[path] = f'"{hashlib.sha1(body).hexdigest()}"'
+
+    def _over_rate_limit(self):
+        """Fixed one-second window counter"""
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            return self._window_count > self.rate_limit
+
+    def _count(self, status):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[str(status)] = self.stats.get(str(status), 0) + 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency or server.jitter:
+                    time.sleep(server.latency + random.random() * server.jitter)
+
+                if server._over_rate_limit():
+                    return self._respond(429, b"Too Many Requests", {"Retry-After": "1"})
+                if server.error_rate and random.random() < server.error_rate:
+                    return self._respond(503, b"Service Unavailable")
+
+                path = urlparse(self.path).path
+                with server._lock:
+                    body = server.pages.get(path)
+                    etag = server._etags.get(path)
+                if body is None:
+                    return self._respond(404, b"Not Found")
+
+                headers = {"Content-Type": "text/html; charset=utf-8"}
+                if server.etag:
+                    headers["ETag"] = etag
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._respond(304, b"", headers)
+                return self._respond(200, body, headers)
+
+            def _respond(self, status, body, headers=None):
+                server._count(status)
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Keep load tests quiet
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Serve dealer fixture pages locally")
+    parser.add_argument("--dealer", choices=("atkinsons", "chards"), default="atkinsons")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None)
+    args = parser.parse_args()
+
+    mock = MockDealerServer(default_pages(args.dealer), port=args.port, latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, rate_limit=args.rate_limit)
+    logger.info(f"Serving {args.dealer} fixtures on {mock.base_url}")
+    try:
+        mock.httpd.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
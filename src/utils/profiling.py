@@ -0,0 +1,178 @@
+"""
+Profiling of scrape cycles
+
+CycleProfiler wraps a scrape cycle in cProfile, tracemalloc and a stack
+sampler, and writes per cycle (named cycle-<YYYYmmdd-HHMMSS.mmm>-<pid>-<n>, so
+runs never overwrite each other's profiles):
+    <name>.prof       cProfile stats (snakeviz, pstats, gprof2dot)
+    <name>.txt        top functions by cumulative time and top allocation sites
+    <name>.collapsed  sampled stacks of every thread in collapsed format
+                      (flamegraph.pl, speedscope, inferno)
+
+Scrapes run on worker threads, which cProfile does not follow on its own, so
+worker tasks are profiled through task_wrapper (installed as the aggregator's
+TASK_WRAPPER) and merged into the cycle's stats.
+
+With every=N only one cycle in N is profiled, so it can stay on in production.
+The count is kept per process: it only thins out profiling for long-running
+loops (main.py --cycles 0), while a one-cycle run always profiles its cycle.
+"""
+import os
+import io
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+
+logger = logging.getLogger('price_scraper')
+
+
+class StackSampler:
+    """Sample the stacks of all threads at a fixed interval"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self):
+        """Stacks in "root;caller;callee count" lines"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+class CycleProfiler:
+    """Profile every Nth scrape cycle and write the results to output_dir"""
+
+    def __init__(self, output_dir="profiles", every=1, top=30, sample_interval=0.005):
+        """
+        Args:
+            output_dir (str): Where profile files are written
+            every (int): Profile one cycle in this many, counted within this process
+            top (int): Functions and allocation sites listed in the text report
+            sample_interval (float): Seconds between stack samples
+        """
+        self.output_dir = output_dir
+        self.every = max(1, every)
+        self.top = top
+        self.sample_interval = sample_interval
+        self.cycle = 0
+        self._task_profiles = None
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def run(self, cycle_function, *args, **kwargs):
+        """Run one cycle, profiling it if it is due"""
+        self.cycle += 1
+        if (self.cycle - 1) % self.every:
+            return cycle_function(*args, **kwargs)
+        return self._profile(cycle_function, *args, **kwargs)
+
+    def task_wrapper(self, function, *args, **kwargs):
+        """Run a worker-thread task, under its own cProfile while a cycle is profiled"""
+        with self._lock:
+            collecting = self._task_profiles is not None
+        if not collecting:
+            return function(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile at a time; the stack
+            # sampler still covers this task
+            return function(*args, **kwargs)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                if self._task_profiles is not None:
+                    self._task_profiles.append(profile)
+
+    def _profile(self, cycle_function, *args, **kwargs):
+        now = time.time()
+        started = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f".{int(now * 1000) % 1000:03d}"
+        base = os.path.join(self.output_dir, f"cycle-{started}-{os.getpid()}-{self.cycle}")
+        sampler = StackSampler(self.sample_interval)
+        profile = cProfile.Profile()
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(10)
+        with self._lock:
+            self._task_profiles = []
+        sampler.start()
+        start = time.perf_counter()
+
+        try:
+            return profile.runcall(cycle_function, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            with self._lock:
+                task_profiles, self._task_profiles = self._task_profiles, None
+
+            self._write(base, profile, task_profiles, snapshot, sampler, elapsed, peak)
+
+    def _write(self, base, profile, task_profiles, snapshot, sampler, elapsed, peak):
+        stats = pstats.Stats(profile)
+        for task_profile in task_profiles:
+            stats.add(task_profile)
+        stats.dump_stats(base + ".prof")
+
+        report = io.StringIO()
+        report.write(f"Cycle {self.cycle}: {elapsed:.3f}s wall, peak traced memory {peak / 1024:.0f} KiB, "
+                     f"{len(task_profiles)} worker tasks\n\n")
+        stats.stream = report
+        stats.sort_stats("cumulative").print_stats(self.top)
+
+        report.write(f"\nTop {self.top} allocation sites\n")
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        for stat in snapshot.statistics("lineno")[:self.top]:
+            report.write(f"{stat}\n")
+
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(sampler.collapsed())
+
+        logger.info(f"Cycle {self.cycle} profiled in {elapsed:.2f}s, written to {base}.*")
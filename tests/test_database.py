@@ -0,0 +1,86 @@
+"""
+Storage tests against mongomock, a local stand-in for MongoDB
+"""
+import time
+from datetime import datetime
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from utils import database
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # pymongo >= 4.9 passes sort= to bulk updates, which mongomock 4.3 does not
+    # accept yet; store_snapshot never sorts, so it is safe to drop
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+    monkeypatch.setattr(mongomock.collection.BulkOperationBuilder, "add_update",
+                        lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs))
+    database.clear_cache()
+    return mongomock.MongoClient().finance_data
+
+
+def snapshot(price, status="fresh", fetched_at=None):
+    return {"chards": {"sovereign": {"price": price, "name": "Gold Sovereign", "status": status,
+                                     "fetched_at": fetched_at or time.time()}}}
+
+
+def test_store_snapshot_writes_history_and_latest(db):
+    assert database.store_snapshot(snapshot(620.0), db=db) == 1
+    assert database.store_snapshot(snapshot(625.0), db=db) == 1
+
+    assert db[database.PRICE_HISTORY_COLLECTION].count_documents({}) == 2
+    latest = database.get_latest_price("chards", "sovereign", db=db)
+    assert latest["price"] == 625.0
+    assert [doc["price"] for doc in database.get_latest_prices("chards", db=db)] == [625.0]
+
+
+def test_store_snapshot_skips_stale_and_failed_items(db):
+    assert database.store_snapshot(snapshot(620.0, status="stale"), db=db) == 0
+    assert database.store_snapshot(snapshot(None, status="failed"), db=db) == 0
+    assert db[database.PRICE_HISTORY_COLLECTION].count_documents({}) == 0
+
+
+def test_first_write_creates_indexes(db):
+    database.store_snapshot(snapshot(620.0), db=db)
+
+    history_keys = [index["key"] for index in db[database.PRICE_HISTORY_COLLECTION].index_information().values()]
+    assert [("symbol", 1), ("timestamp", -1)] in history_keys
+    assert [("source", 1), ("symbol", 1), ("timestamp", -1)] in history_keys
+
+
+def test_store_snapshot_invalidates_cached_latest_reads(db):
+    database.store_snapshot(snapshot(620.0), db=db)
+    assert database.get_latest_price("chards", "sovereign", db=db)["price"] == 620.0
+
+    database.store_snapshot(snapshot(630.0), db=db)
+    assert database.get_latest_price("chards", "sovereign", db=db)["price"] == 630.0
+
+
+def test_price_history_time_range(db):
+    start = datetime(2025, 1, 1).timestamp()
+    for day in range(5):
+        database.store_snapshot(snapshot(600.0 + day, fetched_at=start + day * 86400), db=db)
+
+    docs = database.get_price_history("sovereign", start=datetime.utcfromtimestamp(start + 86400),
+                                      end=datetime.utcfromtimestamp(start + 3 * 86400), db=db)
+    assert [doc["price"] for doc in docs] == [603.0, 602.0, 601.0]
+
+
+def test_get_database_reuses_one_client(monkeypatch):
+    monkeypatch.setenv("MONGODB_URI", "mongodb://localhost:27017")
+    monkeypatch.setattr(database, "MongoClient", mongomock.MongoClient)
+    monkeypatch.setattr(database, "_client", {"uri": None, "client": None})
+
+    assert database.get_database().client is database.get_database().client
+
+
+def test_latest_reads_are_cached_per_database(db):
+    other = mongomock.MongoClient().other_finance_data
+    database.store_snapshot(snapshot(620.0), db=db)
+    database.store_snapshot(snapshot(700.0), db=other)
+
+    assert database.get_latest_price("chards", "sovereign", db=db)["price"] == 620.0
+    assert database.get_latest_price("chards", "sovereign", db=other)["price"] == 700.0
+    assert [doc["price"] for doc in database.get_latest_prices(db=other)] == [700.0]
@@ -0,0 +1,25 @@
+"""
+Portfolio valuation tests
+"""
+from analytics.portfolio import PortfolioBook
+
+
+def test_repeated_ticks_of_unheld_symbol():
+    book = PortfolioBook()
+    book.add_holding("client-1", "sovereign", 2, 1000.0)
+
+    book.update_prices({"XAU": 2000.0, "sovereign": 550.0})
+    book.update_prices({"XAU": 2001.0, "sovereign": 560.0})
+
+    valuation = book.valuation("client-1")
+    assert valuation["market_value"] == 1120.0
+    assert valuation["unpriced"] == 0
+
+
+def test_price_ticked_before_holding_is_used():
+    book = PortfolioBook()
+    book.update_prices({"XAU": 2000.0})
+    book.update_prices({"XAU": 2001.0})
+
+    book.add_holding("client-1", "XAU", 0.5, 900.0)
+    assert book.valuation("client-1")["market_value"] == 1000.5